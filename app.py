@@ -1,115 +1,60 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Request, Response, abort, render_template, request, jsonify, stream_with_context, url_for
 import csv
+import io
+import json
+import os
+import tempfile
 import xml.etree.ElementTree as ET
-import requests
-import yaml
+
+import manifest_parsers
+import parser_registry
+import registry_lookups
+from job_queue import HEARTBEAT, JobQueue
+from registry_lookups import LOOKUPS
+from resolver_service import ResolverService
+from scan_metrics import metrics
+
+# Maximum number of registry lookups in flight across all jobs
+MAX_WORKERS = int(os.environ.get('DEPENDENCY_ANALYSER_WORKERS', '16'))
+
+# Requests larger than this are refused with 413 before their body is read
+MAX_UPLOAD_BYTES = int(os.environ.get('DEPENDENCY_ANALYSER_MAX_UPLOAD_MB', '256')) * 1024 * 1024
+
+# Uploads up to this size are held in memory; larger ones go to a temporary file
+SPOOL_THRESHOLD = int(os.environ.get('DEPENDENCY_ANALYSER_SPOOL_KB', '512')) * 1024
+
+# Most dependencies one upload may queue; every queued dependency stays in memory until its job expires
+MAX_DEPENDENCIES = int(os.environ.get('DEPENDENCY_ANALYSER_MAX_DEPENDENCIES', '100000'))
+
+# Results per chunk of a streamed /jobs/<id> response
+RESULTS_PER_CHUNK = 1000
+
+
+class SpoolingRequest(Request):
+    "Request whose file uploads go to disk past SPOOL_THRESHOLD instead of werkzeug's fixed 500 KB"
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # A real file object either way: SpooledTemporaryFile has no readable() before Python 3.11,
+        # which the TextIOWrapper in manifest_parsers.open_manifest needs
+        # werkzeug passes content_length=0 when the part gives no length of its own
+        size = content_length or total_content_length
+        if size is not None and size <= SPOOL_THRESHOLD:
+            return io.BytesIO()
+        return tempfile.TemporaryFile('rb+')
+
 
 app = Flask(__name__)
+app.request_class = SpoolingRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 
+# Serve lookups from a local snapshot (see offline_index.py) instead of the network
+OFFLINE_INDEX = os.environ.get('DEPENDENCY_ANALYSER_OFFLINE_INDEX')
+if OFFLINE_INDEX:
+    registry_lookups.use_offline_index(OFFLINE_INDEX)
 
-def read_pom_file(file):
-    dependencies = []
-    tree = ET.parse(file)
-    root = tree.getroot()
-    for dependency in root.findall('.//{http://maven.apache.org/POM/4.0.0}dependency'):
-        group_id = dependency.find('{http://maven.apache.org/POM/4.0.0}groupId').text
-        artifact_id = dependency.find('{http://maven.apache.org/POM/4.0.0}artifactId').text
-        current_version = dependency.find('{http://maven.apache.org/POM/4.0.0}version').text
-        dependencies.append((group_id, artifact_id,current_version))
-    return dependencies
-
-
-def read_requirements_file(file):
-    dependencies = []
-    for line in file:
-        line = line.strip()
-        if line and not line.startswith(b"#"):
-            line = line.decode('utf-8')  # Decode bytes to string
-            dependency = line.split('==')
-            if len(dependency) > 1:
-                dependencies.append((dependency[0], dependency[1]))
-            else:
-                dependencies.append((dependency[0], ''))
-    return dependencies
-
-
-def read_gemfile(file):
-    dependencies = []
-    for line in file:
-        line = line.strip()
-        if line.startswith("gem"):
-            parts = line.split("'")
-            if len(parts) >= 2:
-                dependencies.append((parts[1], parts[3]))
-    return dependencies
-
-
-def read_build_gradle(file):
-    dependencies = []
-    for line in file:
-        line = line.strip()
-        if line.startswith(b"implementation"):
-            line = line.decode('utf-8')  # Decode bytes to string
-            parts = line.split("'")
-            if len(parts) >= 6:
-                dependencies.append((parts[1], parts[3], parts[5]))
-    return dependencies
-
-
-def get_stable_version_maven(group_id, artifact_id):
-    url = f"https://search.maven.org/solrsearch/select?q=g:\"{group_id}\"+AND+a:\"{artifact_id}\"&core=gav&rows=20&wt=json"
-    response = requests.get(url)
-    data = response.json()
-    if data['response']['numFound'] > 0:
-        latest_version = data['response']['docs'][0]['v']
-        return latest_version
-    else:
-        return None
-
-
-def get_stable_version_pip(package_name):
-    url = f"https://pypi.org/pypi/{package_name}/json"
-    response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return data["info"]["version"]
-    else:
-        return None
-
-
-def get_stable_version_gem(gem_name):
-    url = f"https://rubygems.org/api/v1/versions/{gem_name}.json"
-    response = requests.get(url)
-    data = response.json()
-    if data:
-        versions = [version['number'] for version in data]
-        filtered_versions = [v for v in versions if all(c.isdigit() or c == '.' for c in v)]
-        if filtered_versions:
-            stable_version = max(filtered_versions, key=lambda v: tuple(map(int, v.split('.'))))
-            return stable_version
-    return None
-
-
-def get_stable_version_gradle(group_id, artifact_id):
-    url = f"https://search.maven.org/solrsearch/select?q=g:\"{group_id}\"+AND+a:\"{artifact_id}\"&core=gav&rows=20&wt=json"
-    response = requests.get(url)
-    data = response.json()
-    if data['response']['numFound'] > 0:
-        latest_version = data['response']['docs'][0]['v']
-        return latest_version
-    else:
-        return None
-
-
-def read_yaml_file(file):
-    data = yaml.safe_load(file)
-    dependencies = []
-    for dependency in data.get('dependencies', []):
-        if 'name' in dependency:
-            name = dependency['name']
-            version = dependency.get('version', '')
-            dependencies.append((name, version))
-    return dependencies
+# One resolver for the life of the app: concurrent uploads share its in-memory cache and in-flight lookups
+resolver = ResolverService(LOOKUPS, MAX_WORKERS)
+job_queue = JobQueue(resolver)
 
 
 def write_to_csv(data, csv_file):
@@ -125,71 +70,128 @@ def index():
     return render_template('index.html')
 
 
+def collect(pending, entries):
+    "Add (Dependency, row) entries parsed incrementally from one upload, enforcing MAX_DEPENDENCIES"
+    try:
+        for entry in entries:
+            if len(pending) >= MAX_DEPENDENCIES:
+                abort(413, description=f"Uploads may list at most {MAX_DEPENDENCIES} dependencies")
+            pending.append(entry)
+    except (ET.ParseError, UnicodeDecodeError) as error:
+        abort(400, description=f"Malformed manifest: {error}")
+    finally:
+        # Stop the parser while its upload is still open, also when the request is refused
+        entries.close()
+
+
 @app.route('/process', methods=['POST'])
 def process():
-    all_dependencies = []
+    # Entries of (Dependency, row) collected from every uploaded file
+    pending = []
 
     # Process POM.xml file
     pom_file = request.files['pom_file']
     if pom_file.filename.endswith('.xml'):
-        all_dependencies.extend(process_pom_file(pom_file))
+        collect(pending, process_pom_file(pom_file))
 
     # Process requirements.txt file
     requirements_file = request.files['requirements_file']
     if requirements_file.filename.endswith('.txt'):
-        all_dependencies.extend(process_requirements_file(requirements_file))
+        collect(pending, process_requirements_file(requirements_file))
 
     # Process Gemfile
     gemfile = request.files['gemfile']
     if gemfile.filename.endswith('.gemfile'):
-        all_dependencies.extend(process_gemfile(gemfile))
+        collect(pending, process_gemfile(gemfile))
 
     # Process build.gradle file
     build_gradle = request.files['build_gradle']
     if build_gradle.filename.endswith('.gradle'):
-        all_dependencies.extend(process_build_gradle(build_gradle))
+        collect(pending, process_build_gradle(build_gradle))
+
+    # Process lockfiles (optional, any number); the format is detected from the file name
+    for lockfile in request.files.getlist('lockfiles'):
+        kind = parser_registry.detect(lockfile.filename or '')
+        if kind is not None:
+            collect(pending, process_lockfile(lockfile, kind))
+
+    # Registry lookups run in the background; clients poll or stream the job
+    job = job_queue.submit(pending)
+    return jsonify({
+        'job_id': job.id,
+        'status_url': url_for('job_status', job_id=job.id),
+        'stream_url': url_for('job_stream', job_id=job.id),
+    }), 202
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    # Prometheus scrape endpoint: parse/lookup/http latency histograms and cache, byte and error counters
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+    summary = job.summary()
+    results = summary.pop('results')
+
+    def generate():
+        # Same document as jsonify(job.summary()), but the results are serialised a chunk at a time
+        yield json.dumps(summary)[:-1] + ', "results": ['
+        for start in range(0, len(results), RESULTS_PER_CHUNK):
+            yield (', ' if start else '') + ', '.join(map(json.dumps, results[start:start + RESULTS_PER_CHUNK]))
+        yield ']}\n'
+
+    return Response(generate(), mimetype='application/json')
+
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        abort(404)
+
+    def generate():
+        # One JSON object per line as each dependency resolves
+        for event in job.stream():
+            if event is HEARTBEAT:
+                yield '\n'
+            elif event is None:
+                yield json.dumps({'status': 'done'}) + '\n'
+            else:
+                index, result = event
+                yield json.dumps({'index': index, 'result': result}) + '\n'
 
-    return jsonify(all_dependencies)
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 def process_pom_file(file):
-    dependencies = read_pom_file(file)
-    processed_dependencies = []
-    for group_id, artifact_id,current_version in dependencies:
-        stable_version = get_stable_version_maven(group_id, artifact_id)
-        if stable_version:
-            processed_dependencies.append((group_id, artifact_id, current_version, stable_version))
-    return processed_dependencies
+    return ((dependency, (dependency.group_id, dependency.artifact_id, dependency.version))
+            for dependency in manifest_parsers.parse_pom(file.stream))
 
 
 def process_requirements_file(file):
-    dependencies = read_requirements_file(file)
-    processed_dependencies = []
-    for package_name, old_version in dependencies:
-        stable_version = get_stable_version_pip(package_name)
-        if stable_version:
-            processed_dependencies.append((package_name,'', old_version,stable_version))
-    return processed_dependencies
+    return ((dependency, (dependency.name, '', dependency.version or ''))
+            for dependency in manifest_parsers.parse_requirements(file.stream))
 
 
 def process_gemfile(file):
-    dependencies = read_gemfile(file)
-    processed_dependencies = []
-    for gem_name, old_version in dependencies:
-        stable_version = get_stable_version_gem(gem_name)
-        if stable_version:
-            processed_dependencies.append((gem_name, '',old_version, stable_version))
-    return processed_dependencies
+    return ((dependency, (dependency.name, '', dependency.version))
+            for dependency in manifest_parsers.parse_gemfile(file.stream))
 
 
 def process_build_gradle(file):
-    dependencies = read_build_gradle(file)
-    processed_dependencies = []
-    for group_id, artifact_id, old_version in dependencies:
-        stable_version = get_stable_version_gradle(group_id, artifact_id)
-        if stable_version:
-            processed_dependencies.append((group_id, artifact_id, old_version, stable_version))
-    return processed_dependencies
+    return ((dependency, (dependency.group_id, dependency.artifact_id, dependency.version))
+            for dependency in manifest_parsers.parse_build_gradle(file.stream))
+
+
+def process_lockfile(file, kind):
+    return ((dependency, (dependency.group_id, dependency.artifact_id, dependency.version)
+             if dependency.ecosystem == 'maven' else (dependency.name, '', dependency.version))
+            for dependency in parser_registry.parse(kind, file.stream))
 
 
 if __name__ == "__main__":
@@ -1,23 +1,48 @@
-from selenium import webdriver
-from bs4 import BeautifulSoup
+import argparse
+import hashlib
+import json
+import os
 import re
 
-from selenium.webdriver.common.by import By
+from bs4 import BeautifulSoup
+
+# One round-trip counting the matches of every locator; invalid XPaths count as -1
+COUNT_MATCHES_SCRIPT = """
+return arguments[0].map(function (locator) {
+    try {
+        return document.evaluate('count(' + locator + ')', document, null, XPathResult.NUMBER_TYPE, null).numberValue;
+    } catch (error) {
+        return -1;
+    }
+});
+"""
 
 
 class XpathUtil:
     "Class to generate the XPaths"
 
-    def __init__(self):
+    def __init__(self, driver=None, offline=True, cache_path=None):
         "Initialize the required variables"
         self.guessable_elements = ['input', 'button','a','p','link','li']
         self.known_attribute_list = ['id', 'name', 'placeholder', 'value', 'title', 'type', 'class']
         self.variable_names = []
         self.button_text_lists = []
         self.language_counter = 1
-
-    def generate_xpath(self, soup):
+        # Locators are checked against the parsed page with lxml; the browser only sees what lxml cannot evaluate
+        self.driver = driver
+        self.offline = offline
+        # Match counts per page hash: {sha256 of the page: {locator: count}}
+        self.cache_path = cache_path
+        self.match_counts = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as file:
+                self.match_counts = json.load(file)
+        self.page_counts = {}
+        self.current_page = ''
+
+    def generate_xpath(self, soup, page=None):
         "Generate the XPath and assign the variable names"
+        self.page_counts = self.count_matches(page if page is not None else str(soup), self.candidate_locators(soup))
         result_flag = False
         for guessable_element in self.guessable_elements:
             elements = soup.find_all(guessable_element)
@@ -26,7 +51,7 @@ class XpathUtil:
                     for attr in self.known_attribute_list:
                         if element.has_attr(attr):
                             locator = self.guess_xpath(guessable_element, attr, element)
-                            if len(driver.find_elements(By.XPATH,locator)) == 1:  # <-- Here is the correction
+                            if self.is_unique(locator):
                                 result_flag = True
                                 variable_name = self.get_variable_names(element)
                                 if variable_name and variable_name not in self.variable_names:
@@ -36,7 +61,7 @@ class XpathUtil:
                         elif guessable_element == 'button' and element.getText():
                             button_text = element.getText()
                             locator = self.guess_xpath_button(guessable_element, "text()", element.getText())
-                            if len(driver.find_elements(By.XPATH,locator)) == 1:  # <-- Here is the correction
+                            if self.is_unique(locator):
                                 result_flag = True
                                 if button_text.lower() not in self.button_text_lists:
                                     self.button_text_lists.append(button_text.lower())
@@ -44,6 +69,59 @@ class XpathUtil:
                                 break
         return result_flag
 
+    def candidate_locators(self, soup):
+        "Every locator generate_xpath may check, so they can be counted in one pass"
+        locators = []
+        for element in soup.find_all('input'):
+            if not element.has_attr("type") or element['type'] != "hidden":
+                for attr in self.known_attribute_list:
+                    if element.has_attr(attr):
+                        locators.append(self.guess_xpath('input', attr, element))
+        return list(dict.fromkeys(locators))
+
+    def is_unique(self, locator):
+        "True if the locator matches exactly one element of the page"
+        count = self.page_counts.get(locator)
+        if count is None:
+            # Not a candidate counted up front
+            count = self.count_matches(self.current_page, [locator])[locator]
+        return count == 1
+
+    def count_matches(self, page, locators):
+        "Number of elements each locator matches in the page, from the cache, lxml or one browser call"
+        self.current_page = page
+        page_hash = hashlib.sha256(page.encode('utf-8')).hexdigest()
+        counts = self.match_counts.setdefault(page_hash, {})
+        missing = [locator for locator in locators if locator not in counts]
+        if missing and self.offline:
+            missing = self.count_offline(page, missing, counts)
+        if missing and self.driver is not None:
+            counts.update(zip(missing, self.driver.execute_script(COUNT_MATCHES_SCRIPT, missing)))
+            missing = []
+        for locator in missing:
+            # Neither lxml nor a browser could evaluate it: never unique
+            counts[locator] = -1
+        if self.cache_path:
+            with open(self.cache_path, 'w', encoding='utf-8') as file:
+                json.dump(self.match_counts, file)
+        return counts
+
+    def count_offline(self, page, locators, counts):
+        "Count matches with lxml, returning the locators it could not evaluate"
+        try:
+            import lxml.etree
+            import lxml.html
+        except ImportError:
+            return locators
+        tree = lxml.html.document_fromstring(page) if page.strip() else None
+        remaining = []
+        for locator in locators:
+            try:
+                counts[locator] = len(tree.xpath(locator)) if tree is not None else 0
+            except lxml.etree.XPathError:
+                remaining.append(locator)
+        return remaining
+
     def get_variable_names(self, element):
         "Generate the variable names for the XPath"
         if element.has_attr('id') and len(element['id']) > 2 and not bool(re.search(r'\d', element['id'])) and (
@@ -79,24 +157,42 @@ class XpathUtil:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate XPaths for the inputs of a web page")
+    parser.add_argument('--url', help="page to open in Chrome (asked for if neither --url nor --html is given)")
+    parser.add_argument('--html', metavar='PATH', help="saved page to generate XPaths for, without a browser")
+    parser.add_argument('--browser-checks', action='store_true',
+                        help="check every locator in the browser instead of against the parsed page")
+    parser.add_argument('--cache', metavar='PATH', help="JSON file keeping locator match counts per page hash")
+    args = parser.parse_args()
+
     print("Start of script")
 
-    # Initialize the XpathUtil object
-    xpath_util = XpathUtil()
+    driver = None
+    if args.html:
+        with open(args.html, 'r', encoding='utf-8') as file:
+            page = file.read()
+        source = args.html
+    else:
+        # Selenium is only needed when a live page is opened
+        from selenium import webdriver
 
-    # Get the URL and parse
-    url = input("Enter URL: ")
+        # Get the URL and parse
+        source = args.url or input("Enter URL: ")
 
-    # Create a chrome session
-    driver = webdriver.Chrome()
-    driver.get(url)
+        # Create a chrome session
+        driver = webdriver.Chrome()
+        driver.get(source)
+        page = driver.execute_script("return document.body.innerHTML").encode('utf-8').decode('latin-1')
+
+    # Initialize the XpathUtil object
+    xpath_util = XpathUtil(driver, offline=not args.browser_checks, cache_path=args.cache)
 
     # Parsing the HTML page with BeautifulSoup
-    page = driver.execute_script("return document.body.innerHTML").encode('utf-8').decode('latin-1')
     soup = BeautifulSoup(page, 'html.parser')
 
     # Execute generate_xpath
-    if xpath_util.generate_xpath(soup) is False:
-        print(f"No XPaths generated for the URL: {url}")
+    if xpath_util.generate_xpath(soup, page) is False:
+        print(f"No XPaths generated for the URL: {source}")
 
-    driver.quit()
\ No newline at end of file
+    if driver is not None:
+        driver.quit()
@@ -0,0 +1,56 @@
+import os
+
+import parser_registry
+
+# Directories that never hold a service's own manifests
+SKIPPED_DIRECTORIES = {'.git', '.hg', '.svn', 'node_modules', '.venv', 'venv', '.tox',
+                       '__pycache__', 'target', 'build', '.gradle', 'vendor'}
+
+# Manifests handed to a worker process at a time
+CHUNK_SIZE = 16
+
+
+def read_repository_list(path):
+    "Repository paths listed one per line in a file; blank lines and # comments are ignored"
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip() and not line.lstrip().startswith('#')]
+
+
+def discover_manifests(roots):
+    "Walk each root for (repository, manifest path) pairs; a repository is the nearest directory with .git, else the root"
+    found = []
+    for root in roots:
+        root = os.path.abspath(root)
+        repositories = [root]
+        for directory, subdirectories, files in os.walk(root):
+            while directory != repositories[-1] and not directory.startswith(repositories[-1] + os.sep):
+                repositories.pop()
+            if directory != root and '.git' in subdirectories + files:
+                repositories.append(directory)
+            subdirectories[:] = sorted(name for name in subdirectories if name not in SKIPPED_DIRECTORIES)
+            for name in sorted(files):
+                if parser_registry.detect(name) is not None:
+                    found.append((repositories[-1], os.path.join(directory, name)))
+    return found
+
+
+def parse_manifest(path):
+    "Parse one manifest in a worker process; returns (path, dependencies, error)"
+    try:
+        return path, list(parser_registry.parse(parser_registry.detect(path), path)), None
+    except Exception as error:
+        return path, [], f"{type(error).__name__}: {error}"
+
+
+def parse_manifests(paths, processes=None):
+    "Parse manifests across a process pool, returning {path: [Dependency]}"
+    parsed = {}
+    if not paths:
+        return parsed
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for path, dependencies, error in executor.map(parse_manifest, paths, chunksize=CHUNK_SIZE):
+            if error is not None:
+                print(f"Warning: Could not parse {path} - {error}")
+            parsed[path] = dependencies
+    return parsed
@@ -0,0 +1,542 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import mock_registry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Share of generated dependencies per manifest
+MANIFEST_MIX = (('requirements.txt', 0.4), ('pom.xml', 0.3), ('Gemfile', 0.3))
+
+DEFAULT_SIZES = (10, 1000, 10000)
+
+# Entry points whose import time is checked, and the budget for each (median cumulative ms, -X importtime);
+# app's budget is mostly Flask's own import
+IMPORT_BUDGETS_MS = {'main': 100.0, 'app': 300.0}
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def generate_manifests(directory, count):
+    "Write requirements.txt, pom.xml, Gemfile and an empty build.gradle declaring count dependencies in total"
+    os.makedirs(directory, exist_ok=True)
+    counts = [int(count * share) for _, share in MANIFEST_MIX]
+    counts[0] += count - sum(counts)
+
+    with open(os.path.join(directory, 'requirements.txt'), 'w', encoding='utf-8') as file:
+        for i in range(counts[0]):
+            file.write(f"bench-package-{i}==1.0.0\n")
+    with open(os.path.join(directory, 'pom.xml'), 'w', encoding='utf-8') as file:
+        file.write('<project xmlns="http://maven.apache.org/POM/4.0.0"><dependencies>\n')
+        for i in range(counts[1]):
+            file.write(f"<dependency><groupId>org.bench.group{i % 100}</groupId><artifactId>artifact-{i}</artifactId>"
+                       f"<version>1.0.0</version></dependency>\n")
+        file.write('</dependencies></project>\n')
+    with open(os.path.join(directory, 'Gemfile'), 'w', encoding='utf-8') as file:
+        file.write("source 'https://rubygems.org'\n")
+        for i in range(counts[2]):
+            file.write(f"gem 'bench-gem-{i}', '1.0.0'\n")
+    open(os.path.join(directory, 'build.gradle'), 'w').close()
+
+
+def generate_lockfiles(directory, count):
+    "Write a Gemfile.lock, poetry.lock, Pipfile.lock, gradle.lockfile and dependency-list.txt of count packages each"
+    os.makedirs(directory, exist_ok=True)
+    digest = '0123456789abcdef' * 4
+
+    with open(os.path.join(directory, 'Gemfile.lock'), 'w', encoding='utf-8') as file:
+        file.write("GEM\n  remote: https://rubygems.org/\n  specs:\n")
+        for i in range(count):
+            file.write(f"    bench-gem-{i} (1.{i % 10}.0)\n")
+            for j in range(1, 4):
+                file.write(f"      bench-gem-{(i + j) % count} (>= 1.0)\n")
+        file.write("\nPLATFORMS\n  ruby\n\nDEPENDENCIES\n")
+        for i in range(0, count, 10):
+            file.write(f"  bench-gem-{i}\n")
+        file.write("\nBUNDLED WITH\n   2.4.10\n")
+
+    with open(os.path.join(directory, 'poetry.lock'), 'w', encoding='utf-8') as file:
+        for i in range(count):
+            file.write(f'[[package]]\nname = "bench-package-{i}"\nversion = "1.{i % 10}.0"\n'
+                       f'description = "Benchmark package {i}"\noptional = false\npython-versions = ">=3.8"\nfiles = [\n')
+            for kind in ('tar.gz', 'whl'):
+                file.write(f'    {{file = "bench_package_{i}-1.0.0.{kind}", hash = "sha256:{digest}"}},\n')
+            file.write(f']\n\n[package.dependencies]\nbench-package-{(i + 1) % count} = ">=1.0"\n\n')
+        file.write('[metadata]\nlock-version = "2.0"\npython-versions = "^3.8"\ncontent-hash = "' + digest + '"\n')
+
+    default = {f"bench-package-{i}": {'hashes': [f"sha256:{digest}", f"sha256:{digest[::-1]}"], 'index': 'pypi',
+                                      'markers': "python_version >= '3.8'", 'version': f"==1.{i % 10}.0"}
+               for i in range(count)}
+    with open(os.path.join(directory, 'Pipfile.lock'), 'w', encoding='utf-8') as file:
+        # pipenv's own layout
+        json.dump({'_meta': {'hash': {'sha256': digest}, 'pipfile-spec': 6, 'requires': {'python_version': '3.11'},
+                             'sources': [{'name': 'pypi', 'url': 'https://pypi.org/simple', 'verify_ssl': True}]},
+                   'default': default, 'develop': {}}, file, indent=4, separators=(',', ': '), sort_keys=True)
+
+    with open(os.path.join(directory, 'gradle.lockfile'), 'w', encoding='utf-8') as file:
+        file.write("# This is a Gradle generated file for dependency locking.\n")
+        for i in range(count):
+            file.write(f"org.bench.group{i % 100}:artifact-{i}:1.{i % 10}.0=compileClasspath,runtimeClasspath\n")
+        file.write("empty=annotationProcessor\n")
+
+    with open(os.path.join(directory, 'dependency-list.txt'), 'w', encoding='utf-8') as file:
+        file.write("[INFO] --- maven-dependency-plugin:3.6.0:list (default-cli) @ bench ---\n"
+                   "[INFO] The following files have been resolved:\n")
+        for i in range(count):
+            file.write(f"[INFO]    org.bench.group{i % 100}:artifact-{i}:jar:1.{i % 10}.0:compile -- module artifact.{i}\n")
+        file.write("[INFO] BUILD SUCCESS\n")
+
+
+def bench_lockfiles(directory, count):
+    "Parse generated lockfiles of count packages, reporting throughput and the parser's peak traced memory"
+    import tracemalloc
+
+    import parser_registry
+    generate_lockfiles(directory, count)
+    results = {}
+    for name in ('Gemfile.lock', 'poetry.lock', 'Pipfile.lock', 'gradle.lockfile', 'dependency-list.txt'):
+        path = os.path.join(directory, name)
+        parse = parser_registry.parser_for(parser_registry.detect(name))
+        started = time.perf_counter()
+        dependencies = sum(1 for _ in parse(path))
+        elapsed = time.perf_counter() - started
+
+        # Separate pass: tracing slows parsing down
+        tracemalloc.start()
+        for _ in parse(path):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        size = os.path.getsize(path)
+        results[name] = {
+            'bytes': size,
+            'dependencies': dependencies,
+            'seconds': elapsed,
+            'mib_per_second': size / 1048576 / elapsed if elapsed else None,
+            'dependencies_per_second': dependencies / elapsed if elapsed else None,
+            'peak_traced_kib': peak / 1024,
+        }
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_process(command, env, cwd):
+    "Run a command to completion, returning (seconds, peak RSS in KiB, exit status)"
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, cwd=cwd, stdout=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - started, usage.ru_maxrss, process.returncode
+
+
+def bench_parse(directory):
+    "Parse the generated manifests in-process and time each parser"
+    import manifest_parsers
+    parsers = {
+        'requirements.txt': manifest_parsers.parse_requirements,
+        'pom.xml': manifest_parsers.parse_pom,
+        'Gemfile': manifest_parsers.parse_gemfile,
+        'build.gradle': manifest_parsers.parse_build_gradle,
+    }
+    dependencies = []
+    timings = {}
+    for name, parse in parsers.items():
+        started = time.perf_counter()
+        dependencies.extend(parse(os.path.join(directory, name)))
+        timings[name] = time.perf_counter() - started
+    return dependencies, timings
+
+
+def bench_resolve(dependencies, workers):
+    "Resolve through main.py's lookup functions in-process, timing every lookup"
+    import main
+    latencies = []
+    lookups = dict(main.LOOKUPS)
+
+    def timed(lookup):
+        def call(name):
+            started = time.perf_counter()
+            try:
+                return lookup(name)
+            finally:
+                latencies.append(time.perf_counter() - started)
+        return call
+
+    main.LOOKUPS.update({ecosystem: timed(lookup) for ecosystem, lookup in lookups.items()})
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = main.resolve_dependencies(dependencies, executor)
+        elapsed = time.perf_counter() - started
+    finally:
+        main.LOOKUPS.update(lookups)
+    return {
+        'seconds': elapsed,
+        'lookups': len(latencies),
+        'lookups_per_second': len(latencies) / elapsed if elapsed else None,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'not_found': sum(row['new_version'] == 'Not found' for row in rows),
+    }
+
+
+def bench_cli(directory, env, workers):
+    seconds, peak_rss, status = run_process([sys.executable, os.path.join(HERE, 'main.py'), '--workers', str(workers)],
+                                            env, directory)
+    return {'seconds': seconds, 'peak_rss_kib': peak_rss, 'exit_status': status}
+
+
+def start_app(env):
+    "Run app.py on a free port; returns (process, base URL) once it answers"
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-c', f"import app; app.app.run(port={port}, threaded=True)"],
+                               env=env, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            requests.get(base, timeout=1)
+            return process, base
+        except requests.ConnectionError:
+            if time.monotonic() > deadline:
+                process.terminate()
+                raise
+            time.sleep(0.1)
+
+
+def peak_rss_kib(pid):
+    "High-water mark of a running process's resident memory (Linux), or None"
+    try:
+        with open(f"/proc/{pid}/status", 'r', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def bench_app(directory, env, timeout=600):
+    "Upload the manifests to app.py /process and follow the job's result stream"
+    process, base = start_app(env)
+    try:
+        # app.py picks parsers by upload file name, and expects Gemfiles named *.gemfile
+        files = {field: (upload_name, open(os.path.join(directory, name), 'rb')) for field, name, upload_name in (
+            ('pom_file', 'pom.xml', 'pom.xml'), ('requirements_file', 'requirements.txt', 'requirements.txt'),
+            ('gemfile', 'Gemfile', 'Gemfile.gemfile'), ('build_gradle', 'build.gradle', 'build.gradle'))}
+        started = time.perf_counter()
+        try:
+            response = requests.post(f"{base}/process", files=files, timeout=timeout)
+        finally:
+            for _, file in files.values():
+                file.close()
+        accepted = time.perf_counter() - started
+        response.raise_for_status()
+
+        arrivals = []
+        with requests.get(base + response.json()['stream_url'], stream=True, timeout=timeout) as stream:
+            for line in stream.iter_lines():
+                if line and 'index' in json.loads(line):
+                    arrivals.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - started
+    finally:
+        process.terminate()
+        _, _, usage = os.wait4(process.pid, 0)
+    return {
+        'seconds': elapsed,
+        'accepted_seconds': accepted,
+        'results': len(arrivals),
+        'results_per_second': len(arrivals) / elapsed if elapsed else None,
+        'p50_result_ms': percentile(arrivals, 50) * 1000 if arrivals else None,
+        'p99_result_ms': percentile(arrivals, 99) * 1000 if arrivals else None,
+        'peak_rss_kib': usage.ru_maxrss,
+    }
+
+
+def generate_large_pom(path, size_mb, count):
+    "A POM of about size_mb with count dependencies, padded with plugin configuration like an effective POM"
+    padding = ('<plugin><groupId>org.bench.plugins</groupId><artifactId>bench-plugin</artifactId><configuration>'
+               + '<property>' + 'x' * 900 + '</property>' + '</configuration></plugin>\n')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('<project xmlns="http://maven.apache.org/POM/4.0.0"><dependencies>\n')
+        for i in range(count):
+            file.write(f"<dependency><groupId>org.bench.group{i % 100}</groupId><artifactId>artifact-{i}</artifactId>"
+                       f"<version>1.0.0</version></dependency>\n")
+        file.write('</dependencies><build><plugins>\n')
+        for _ in range(max(0, (size_mb * 1024 * 1024 - file.tell()) // len(padding))):
+            file.write(padding)
+        file.write('</plugins></build></project>\n')
+
+
+class MultipartBody:
+    "multipart/form-data body streamed from files on disk, so the benchmark does not hold the upload in memory"
+    boundary = 'dependency-analyser-benchmark'
+
+    def __init__(self, files):
+        "files are (field, upload file name, path) triples"
+        self.parts = []
+        for field, upload_name, path in files:
+            self.parts.append(f"--{self.boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; "
+                              f"filename=\"{upload_name}\"\r\nContent-Type: application/octet-stream\r\n\r\n".encode())
+            self.parts.append(path)
+            self.parts.append(b'\r\n')
+        self.parts.append(f"--{self.boundary}--\r\n".encode())
+        self.length = sum(len(part) if isinstance(part, bytes) else os.path.getsize(part) for part in self.parts)
+        self.chunks = self.iter_chunks()
+
+    content_type = property(lambda self: f"multipart/form-data; boundary={self.boundary}")
+
+    def iter_chunks(self):
+        for part in self.parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                with open(part, 'rb') as file:
+                    yield from iter(lambda: file.read(1024 * 1024), b'')
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return next(self.chunks, b'')
+
+
+def bench_upload(directory, size_mb, env, dependencies=2000, timeout=600):
+    "Upload a size_mb POM to app.py and report the server's resident memory before and after parsing it"
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"effective-pom-{size_mb}mb.xml")
+    if not os.path.exists(path):
+        generate_large_pom(path, size_mb, dependencies)
+    empty = os.path.join(directory, 'empty')
+    open(empty, 'w').close()
+
+    process, base = start_app(env)
+    try:
+        idle_kib = peak_rss_kib(process.pid)
+        body = MultipartBody([('pom_file', 'pom.xml', path), ('requirements_file', 'requirements.txt', empty),
+                              ('gemfile', 'Gemfile.gemfile', empty), ('build_gradle', 'build.gradle', empty)])
+        started = time.perf_counter()
+        response = requests.post(f"{base}/process", data=body, headers={'Content-Type': body.content_type},
+                                 timeout=timeout)
+        accepted = time.perf_counter() - started
+        result = {'upload_mib': os.path.getsize(path) / 1048576, 'status': response.status_code,
+                  'accepted_seconds': accepted, 'idle_peak_rss_kib': idle_kib, 'results': None}
+        if response.status_code == 202:
+            with requests.get(base + response.json()['stream_url'], stream=True, timeout=timeout) as stream:
+                result['results'] = sum(1 for line in stream.iter_lines() if line and 'index' in json.loads(line))
+        result['seconds'] = time.perf_counter() - started
+        result['peak_rss_kib'] = peak_rss_kib(process.pid)
+    finally:
+        process.terminate()
+        _, _, usage = os.wait4(process.pid, 0)
+    if result['peak_rss_kib'] is None:
+        result['peak_rss_kib'] = usage.ru_maxrss
+    return result
+
+
+def print_upload(results):
+    print("== large uploads")
+    for mode, upload in results:
+        idle = upload['idle_peak_rss_kib']
+        print(f"  {upload['upload_mib']:.0f} MiB POM ({mode:<9}) status {upload['status']}  {upload['seconds']:.2f}s  "
+              f"peak RSS {upload['peak_rss_kib'] / 1024:.1f} MiB"
+              + (f" (+{(upload['peak_rss_kib'] - idle) / 1024:.1f} MiB over idle)" if idle else "")
+              + (f"  {upload['results']} results" if upload['results'] is not None else ""))
+
+
+def import_time(module, env):
+    "Cumulative import time of module in a fresh interpreter, in ms, as reported by -X importtime"
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], env=env, cwd=HERE,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    for line in reversed(completed.stderr.splitlines()):
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def bench_import(budgets, repeat, env):
+    "Median import time of each entry point and of main.py --help, checked against the budgets"
+    results = {}
+    for module, budget_ms in budgets.items():
+        median = percentile([import_time(module, env) for _ in range(repeat)], 50)
+        results[module] = {'median_ms': median, 'budget_ms': budget_ms, 'within_budget': median <= budget_ms}
+    startups = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, 'main.py'), '--help'], env=env, cwd=HERE,
+                       stdout=subprocess.DEVNULL, check=True)
+        startups.append((time.perf_counter() - started) * 1000)
+    results['main.py --help'] = {'median_ms': percentile(startups, 50)}
+    return results
+
+
+def print_import(results):
+    print("== import time")
+    for target, result in results.items():
+        budget = ''
+        if 'budget_ms' in result:
+            budget = f"  budget {result['budget_ms']:.0f}ms  {'ok' if result['within_budget'] else 'OVER BUDGET'}"
+        print(f"  {target:<15}{result['median_ms']:.1f}ms{budget}")
+
+
+def run(size, server, args, work_directory):
+    directory = os.path.join(work_directory, f"manifests-{size}")
+    generate_manifests(directory, size)
+    env = dict(os.environ, **mock_registry.environment(server.url))
+    env['DEPENDENCY_ANALYSER_WORKERS'] = str(args.workers)
+
+    def cache_path(stage):
+        # Cold runs get an empty cache per stage; warm runs share one primed cache
+        return os.path.join(work_directory, f"cache-{size}.sqlite3" if args.cache == 'warm' else f"cache-{size}-{stage}.sqlite3")
+
+    import registry_cache
+    result = {'size': size}
+    if 'lockfiles' in args.targets:
+        result['lockfiles'] = bench_lockfiles(os.path.join(work_directory, f"lockfiles-{size}"), size)
+    dependencies, timings = bench_parse(directory)
+    result['parse'] = {'seconds': sum(timings.values()), 'dependencies': len(dependencies),
+                       'per_manifest': timings}
+
+    registry_cache.cache_enabled = args.cache != 'off'
+    if args.cache == 'warm':
+        registry_cache.default_cache = registry_cache.RegistryCache(cache_path('resolve'))
+        bench_resolve(dependencies, args.workers)
+    elif args.cache == 'cold':
+        registry_cache.default_cache = registry_cache.RegistryCache(cache_path('resolve'))
+    server.registry.reset()
+    result['resolve'] = bench_resolve(dependencies, args.workers)
+    result['resolve']['registry'] = server.registry.stats()
+
+    if 'cli' in args.targets:
+        env['DEPENDENCY_ANALYSER_CACHE'] = cache_path('cli') if args.cache != 'off' else ':memory:'
+        server.registry.reset()
+        result['cli'] = bench_cli(directory, env, args.workers)
+        result['cli']['registry'] = server.registry.stats()
+    if 'app' in args.targets:
+        env['DEPENDENCY_ANALYSER_CACHE'] = cache_path('app') if args.cache != 'off' else ':memory:'
+        server.registry.reset()
+        result['app'] = bench_app(directory, env)
+        result['app']['registry'] = server.registry.stats()
+    return result
+
+
+def print_result(result):
+    def ms(value):
+        return '-' if value is None else f"{value:.1f}ms"
+
+    print(f"== {result['size']} dependencies")
+    for name, lockfile in result.get('lockfiles', {}).items():
+        print(f"  {name:<20} {lockfile['seconds']:.3f}s  {lockfile['mib_per_second'] or 0:.1f} MiB/s  "
+              f"{lockfile['dependencies_per_second'] or 0:.0f} deps/s  ({lockfile['dependencies']} parsed, "
+              f"{lockfile['bytes'] / 1048576:.1f} MiB, peak {lockfile['peak_traced_kib']:.0f} KiB)")
+    parse = result['parse']
+    print(f"  parse    {parse['seconds']:.3f}s  ({parse['dependencies']} parsed)")
+    resolve = result['resolve']
+    print(f"  resolve  {resolve['seconds']:.3f}s  {resolve['lookups_per_second'] or 0:.0f} lookups/s  "
+          f"p50 {ms(resolve['p50_ms'])}  p99 {ms(resolve['p99_ms'])}  registry {resolve['registry']}")
+    if 'cli' in result:
+        cli = result['cli']
+        print(f"  main.py  {cli['seconds']:.3f}s  peak RSS {cli['peak_rss_kib'] / 1024:.1f} MiB  "
+              f"exit {cli['exit_status']}  registry {cli['registry']}")
+    if 'app' in result:
+        app = result['app']
+        print(f"  app.py   {app['seconds']:.3f}s  {app['results_per_second'] or 0:.0f} results/s  "
+              f"p50 {ms(app['p50_result_ms'])}  p99 {ms(app['p99_result_ms'])}  "
+              f"peak RSS {app['peak_rss_kib'] / 1024:.1f} MiB  registry {app['registry']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scans against a local mock registry")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated dependency counts to generate manifests for")
+    parser.add_argument('--targets', default='cli,app',
+                        help="comma separated subset of cli,app to run end to end, import for start-up time, "
+                             "lockfiles for lockfile parser throughput and upload for app memory on large uploads")
+    parser.add_argument('--workers', type=int, default=16, help="concurrent lookups")
+    parser.add_argument('--cache', choices=['cold', 'warm', 'off'], default='cold',
+                        help="registry response cache: empty, primed by an untimed run, or disabled")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="mock registry response delay")
+    parser.add_argument('--jitter-ms', type=float, default=5.0, help="random +/- variation of the delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--rate-limit', type=float, help="mock registry requests per second before 429")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="fraction of packages that do not exist")
+    parser.add_argument('--import-budget', action='append', default=[], metavar='MODULE=MS',
+                        help="override an import time budget; the run fails when a median exceeds its budget")
+    parser.add_argument('--import-repeat', type=int, default=5, help="interpreter starts per import measurement")
+    parser.add_argument('--upload-mb', default='50,200',
+                        help="comma separated POM sizes for the upload target; each is also run held fully in memory")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--keep', action='store_true', help="keep the generated manifests and caches")
+    args = parser.parse_args()
+    args.targets = {target for target in args.targets.split(',') if target}
+
+    imports = None
+    if 'import' in args.targets:
+        # Measured before anything else runs, without the mock registry settings
+        budgets = dict(IMPORT_BUDGETS_MS)
+        for budget in args.import_budget:
+            module, _, ms = budget.partition('=')
+            budgets[module] = float(ms)
+        imports = bench_import(budgets, args.import_repeat, dict(os.environ))
+        print_import(imports)
+
+    # Lookups made in this process must reach the mock registry too
+    server = mock_registry.start_server(mock_registry.MockRegistry(
+        args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, args.rate_limit, args.missing_rate, seed=0))
+    os.environ.update(mock_registry.environment(server.url))
+    os.environ['DEPENDENCY_ANALYSER_WORKERS'] = str(args.workers)
+
+    work_directory = tempfile.mkdtemp(prefix='dependency-analyser-bench-')
+    results = []
+    uploads = []
+    try:
+        if 'upload' in args.targets:
+            env = dict(os.environ, DEPENDENCY_ANALYSER_CACHE=':memory:')
+            for size_mb in (int(size_mb) for size_mb in args.upload_mb.split(',') if size_mb):
+                # Spooled as the app is configured, then with a spool threshold above the upload size
+                directory = os.path.join(work_directory, 'uploads')
+                uploads.append(('spooled', bench_upload(directory, size_mb, env)))
+                uploads.append(('in memory', bench_upload(
+                    directory, size_mb, dict(env, DEPENDENCY_ANALYSER_SPOOL_KB=str((size_mb + 1) * 1024)))))
+            print_upload(uploads)
+        for size in (int(size) for size in args.sizes.split(',') if size):
+            results.append(run(size, server, args, work_directory))
+            print_result(results[-1])
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(work_directory, ignore_errors=True)
+        else:
+            print(f"Benchmark files kept in {work_directory}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'settings': {key: (sorted(value) if isinstance(value, set) else value)
+                                    for key, value in vars(args).items()},
+                       'imports': imports, 'uploads': [dict(upload, mode=mode) for mode, upload in uploads],
+                       'results': results}, file, indent=2)
+
+    if imports and not all(result.get('within_budget', True) for result in imports.values()):
+        sys.exit(1)
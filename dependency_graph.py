@@ -0,0 +1,373 @@
+import re
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import Future
+
+import maven_metadata
+import pypi_simple
+import registry_cache
+import registry_client
+from resolution_planner import normalize_name
+from version_ordering import extract_version, latest_satisfying
+
+# Levels of transitive dependencies expanded below the manifest's own entries
+DEFAULT_MAX_DEPTH = 3
+
+# Expansion stops once the graph holds this many nodes
+DEFAULT_MAX_NODES = 50000
+
+# Roots named in a node's introduced_by text; the rest are only counted
+INTRODUCED_BY_LIMIT = 10
+
+# Parent and import-BOM chains longer than this are treated as broken
+MAX_PARENT_DEPTH = 10
+
+PROPERTY = re.compile(r'\$\{([^}]+)\}')
+
+# Distribution name and specifier of a requires_dist entry such as "idna (<4,>=2.5)" or
+# "requests[socks]>=2.26", without its environment marker
+REQUIREMENT = re.compile(r'^\s*([A-Za-z0-9._-]+)\s*(?:\[[^\]]*\])?\s*\(?\s*([^()]*?)\s*\)?\s*$')
+
+# Maven scopes that end up on a consumer's runtime classpath
+TRANSITIVE_SCOPES = ('', 'compile', 'runtime')
+
+
+class DependencyGraph:
+    "Dependency graph with nodes interned as integer ids and adjacency kept in compact arrays"
+
+    def __init__(self):
+        self.ids = {}
+        self.nodes = []
+        self.children = []
+        self.roots = array('I')
+        self.parents = None
+        # One byte per node, set for roots; built with the reverse index
+        self.root_flags = None
+        self.truncated = False
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_id(self, node):
+        "Return the id of an (ecosystem, name, version) node, adding it if new"
+        node_id = self.ids.get(node)
+        if node_id is None:
+            node_id = self.ids[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.children.append(array('I'))
+            self.parents = None
+        return node_id
+
+    def add_edge(self, parent_id, child_id):
+        if child_id not in self.children[parent_id]:
+            self.children[parent_id].append(child_id)
+            self.parents = None
+
+    def build_reverse_index(self):
+        # CSR layout: parents of node i are parent_ids[starts[i]:starts[i + 1]]
+        counts = array('I', bytes(4 * (len(self.nodes) + 1)))
+        for children in self.children:
+            for child_id in children:
+                counts[child_id + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        parent_ids = array('I', bytes(4 * counts[-1]))
+        fill = array('I', counts)
+        for parent_id, children in enumerate(self.children):
+            for child_id in children:
+                parent_ids[fill[child_id]] = parent_id
+                fill[child_id] += 1
+        self.parents = (counts, parent_ids)
+        self.root_flags = bytearray(len(self.nodes))
+        for root_id in self.roots:
+            self.root_flags[root_id] = 1
+
+    def dependents(self, node_id):
+        "Ids of the nodes that directly pull in node_id"
+        if self.parents is None:
+            self.build_reverse_index()
+        starts, parent_ids = self.parents
+        return parent_ids[starts[node_id]:starts[node_id + 1]]
+
+    def pulled_in_by(self, node_id):
+        "Ids of the manifest entries (roots) that pull in node_id, directly or transitively"
+        if self.parents is None:
+            self.build_reverse_index()
+        seen = {node_id}
+        stack = [node_id]
+        found = []
+        while stack:
+            for parent_id in self.dependents(stack.pop()):
+                if parent_id not in seen:
+                    seen.add(parent_id)
+                    stack.append(parent_id)
+                    if self.root_flags[parent_id]:
+                        found.append(parent_id)
+        return sorted(found)
+
+    def introduced_by(self, node_id, limit=INTRODUCED_BY_LIMIT):
+        "The roots that pull in node_id as 'name@version' text, the first limit of them and a count of the rest"
+        root_ids = self.pulled_in_by(node_id)
+        text = ' '.join(f"{self.nodes[root_id][1]}@{self.nodes[root_id][2]}" for root_id in root_ids[:limit])
+        if len(root_ids) > limit:
+            text += f" +{len(root_ids) - limit} more"
+        return text
+
+
+def resolve_properties(text, properties, depth=0):
+    "Substitute ${...} references, leaving unknown ones in place"
+    if not text or '${' not in text or depth > 5:
+        return text
+    resolved = PROPERTY.sub(lambda match: properties.get(match.group(1), match.group(0)), text)
+    return resolved if resolved == text else resolve_properties(resolved, properties, depth + 1)
+
+
+def child_text(element, name, namespace):
+    child = element.find(f'{namespace}{name}')
+    return child.text.strip() if child is not None and child.text else ''
+
+
+class MavenModels:
+    "Effective POM models (properties, dependencyManagement, dependencies); parents and BOMs built once per coordinate"
+
+    def __init__(self, repository=None):
+        "repository is the Maven repository to read POMs from, or None for maven_metadata.repository_url"
+        self.repository = repository
+        # Parent and BOM models, (group, artifact, version) -> Future of {'properties', 'managed'}
+        self.models = {}
+        # Thread building each model still in progress, and the model each waiting thread waits for
+        self.builders = {}
+        self.waiting = {}
+        self.lock = threading.Lock()
+
+    def model(self, group_id, artifact_id, version, depth=0):
+        "Properties and managed versions of a parent or BOM, built once however many threads ask for it"
+        key = (group_id, artifact_id, version)
+        thread = threading.get_ident()
+        with self.lock:
+            future = self.models.get(key)
+            building = future is None
+            if building:
+                future = self.models[key] = Future()
+                self.builders[key] = thread
+            elif not future.done():
+                if self.waits_on(key, thread):
+                    # The parent or BOM chain loops back to a model this thread is building
+                    return None
+                self.waiting[thread] = key
+        if not building:
+            try:
+                return future.result()
+            finally:
+                with self.lock:
+                    self.waiting.pop(thread, None)
+        try:
+            model = self.build_model(group_id, artifact_id, version, depth)
+            if model is not None:
+                # Only what inheriting and importing POMs read; the dependency list is not kept
+                model = {'properties': model['properties'], 'managed': model['managed']}
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(model)
+        finally:
+            with self.lock:
+                del self.builders[key]
+        return model
+
+    def waits_on(self, key, thread):
+        "True if the thread building key is, through the threads it waits for, waiting on thread"
+        builder = self.builders.get(key)
+        while builder is not None:
+            if builder == thread:
+                return True
+            builder = self.builders.get(self.waiting.get(builder))
+        return False
+
+    def release(self):
+        "Drop the parent and BOM models built so far"
+        with self.lock:
+            self.models = {}
+
+    def build_model(self, group_id, artifact_id, version, depth):
+        if depth > MAX_PARENT_DEPTH:
+            return None
+        text = maven_metadata.read_pom(group_id, artifact_id, version, self.repository)
+        if text is None:
+            return None
+        try:
+            root = ET.fromstring(text.encode('utf-8'))
+        except ET.ParseError:
+            return None
+        namespace = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+
+        properties = {}
+        managed = {}
+        parent = root.find(f'{namespace}parent')
+        if parent is not None:
+            parent_model = self.model(child_text(parent, 'groupId', namespace),
+                                      child_text(parent, 'artifactId', namespace),
+                                      child_text(parent, 'version', namespace), depth + 1)
+            if parent_model is not None:
+                properties.update(parent_model['properties'])
+                managed.update(parent_model['managed'])
+            properties['project.parent.version'] = child_text(parent, 'version', namespace)
+
+        properties['project.groupId'] = child_text(root, 'groupId', namespace) or properties.get('project.groupId', '')
+        properties['project.version'] = child_text(root, 'version', namespace) or properties.get('project.parent.version', '')
+        properties['project.artifactId'] = artifact_id
+        own_properties = root.find(f'{namespace}properties')
+        if own_properties is not None:
+            for element in own_properties:
+                properties[element.tag[len(namespace):]] = (element.text or '').strip()
+
+        def read_dependencies(container):
+            for element in container.findall(f'{namespace}dependencies/{namespace}dependency'):
+                yield {
+                    'groupId': resolve_properties(child_text(element, 'groupId', namespace), properties),
+                    'artifactId': resolve_properties(child_text(element, 'artifactId', namespace), properties),
+                    'version': resolve_properties(child_text(element, 'version', namespace), properties),
+                    'scope': child_text(element, 'scope', namespace),
+                    'type': child_text(element, 'type', namespace),
+                    'optional': child_text(element, 'optional', namespace) == 'true',
+                }
+
+        management = root.find(f'{namespace}dependencyManagement')
+        if management is not None:
+            for dependency in read_dependencies(management):
+                if dependency['scope'] == 'import' and dependency['type'] == 'pom':
+                    # BOM: its managed versions apply here
+                    bom = self.model(dependency['groupId'], dependency['artifactId'], dependency['version'], depth + 1)
+                    if bom is not None:
+                        for coordinate, managed_version in bom['managed'].items():
+                            managed.setdefault(coordinate, managed_version)
+                else:
+                    managed[(dependency['groupId'], dependency['artifactId'])] = dependency['version']
+
+        return {
+            'properties': properties,
+            'managed': managed,
+            'dependencies': list(read_dependencies(root)),
+        }
+
+    def children(self, group_id, artifact_id, version):
+        "Compile/runtime dependencies of an artifact as (ecosystem, name, version) nodes"
+        # Each artifact is expanded once per graph, so its own model is not cached
+        model = self.build_model(group_id, artifact_id, version, 0)
+        if model is None:
+            return []
+        children = []
+        for dependency in model['dependencies']:
+            if dependency['optional'] or dependency['scope'] not in TRANSITIVE_SCOPES:
+                continue
+            coordinate = (dependency['groupId'], dependency['artifactId'])
+            child_version = dependency['version'] or model['managed'].get(coordinate, '')
+            if child_version and '${' not in child_version:
+                children.append(('maven', f"{coordinate[0]}:{coordinate[1]}", extract_version(child_version)))
+        return children
+
+
+class GraphResolver:
+    "Expands manifest entries into a transitive graph, expanding each shared subtree only once"
+
+    def __init__(self, lookups, max_depth=DEFAULT_MAX_DEPTH, max_nodes=DEFAULT_MAX_NODES, repository=None):
+        "lookups maps ecosystem -> function(name) giving the version used for unpinned packages"
+        self.lookups = lookups
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.maven = MavenModels(repository)
+        # node -> child nodes, for the resolve() in progress
+        self.expanded = {}
+
+    def concrete_node(self, ecosystem, name, version):
+        version = extract_version(version)
+        if not version:
+            version = self.lookups[ecosystem](name)
+        # One node per package however the manifests and requires_dist spell its name
+        return (ecosystem, normalize_name(ecosystem, name), version) if version else None
+
+    def pypi_version(self, name, specifier):
+        "Highest release of a PyPI project that meets a requires_dist specifier, as pip would install"
+        versions = pypi_simple.get_versions(name)
+        if versions == pypi_simple.UNSUPPORTED:
+            data = registry_cache.get_json('pypi', name, f"{registry_client.PYPI_URL}/pypi/{name}/json")
+            versions = list(data['releases']) if data else None
+        return latest_satisfying(versions, specifier) if versions else None
+
+    def pypi_children(self, name, version):
+        url = f"{registry_client.PYPI_URL}/pypi/{name}/{version}/json"
+        data = registry_cache.get_json('pypi', f"{name}=={version}", url)
+        if not data:
+            return []
+        children = []
+        for requirement in data['info'].get('requires_dist') or []:
+            requirement, _, marker = requirement.partition(';')
+            # Optional extras are not installed by default
+            if 'extra' in marker:
+                continue
+            match = REQUIREMENT.match(requirement)
+            # Direct URL requirements ("name @ https://...") are not on the index
+            if not match or match.group(2).startswith('@'):
+                continue
+            child_name, specifier = match.groups()
+            if specifier:
+                child_version = self.pypi_version(child_name, specifier)
+                node = ('pypi', normalize_name('pypi', child_name), child_version) if child_version else None
+            else:
+                node = self.concrete_node('pypi', child_name, None)
+            if node:
+                children.append(node)
+        return children
+
+    def expand(self, node):
+        "Children of node, fetched on first use and memoized"
+        if node not in self.expanded:
+            ecosystem, name, version = node
+            if ecosystem == 'maven':
+                self.expanded[node] = self.maven.children(*name.split(':', 1), version)
+            elif ecosystem == 'pypi':
+                self.expanded[node] = self.pypi_children(name, version)
+            else:
+                self.expanded[node] = []
+        return self.expanded[node]
+
+    def resolve(self, dependencies, executor):
+        "Build the graph for Dependency records, expanding one level at a time on executor"
+        try:
+            return self.build_graph(dependencies, executor)
+        finally:
+            # The graph holds everything callers need; the fetched models and child lists can go
+            self.expanded = {}
+            self.maven.release()
+
+    def build_graph(self, dependencies, executor):
+        graph = DependencyGraph()
+        level = []
+        # Unpinned entries need a registry lookup, so they are resolved on the executor too
+        nodes = executor.map(lambda dependency: self.concrete_node(dependency.ecosystem, dependency.name,
+                                                                   dependency.version), dependencies)
+        for node in nodes:
+            if node is not None:
+                node_id = graph.node_id(node)
+                graph.roots.append(node_id)
+                level.append(node_id)
+
+        for _ in range(self.max_depth):
+            level = sorted(set(level))
+            if not level:
+                break
+            next_level = []
+            for node_id, children in zip(level, executor.map(lambda i: self.expand(graph.nodes[i]), level)):
+                for child in children:
+                    if child not in graph.ids and len(graph) >= self.max_nodes:
+                        graph.truncated = True
+                        continue
+                    is_new = child not in graph.ids
+                    child_id = graph.node_id(child)
+                    graph.add_edge(node_id, child_id)
+                    if is_new:
+                        next_level.append(child_id)
+            level = next_level
+        return graph
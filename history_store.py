@@ -0,0 +1,236 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from report_writers import report_record
+
+# Result fields whose changes are recorded; a package is outdated when it has a recommendation
+STATE_FIELDS = ('current_version', 'latest_version', 'upgrade_type', 'vulnerabilities', 'outdated')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    label TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    ecosystem TEXT NOT NULL,
+    name TEXT NOT NULL,
+    -- Run of the package's latest change, so appending a run needs no scan of the history
+    last_run INTEGER,
+    UNIQUE (repository, ecosystem, name)
+);
+CREATE INDEX IF NOT EXISTS packages_by_name ON packages (ecosystem, name);
+-- One row per package per run in which its result differed from the run before; removed packages
+-- get a row with current_version NULL. Unchanged runs store nothing, so nightly history stays small
+CREATE TABLE IF NOT EXISTS changes (
+    package_id INTEGER NOT NULL REFERENCES packages (id),
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    current_version TEXT,
+    latest_version TEXT,
+    upgrade_type TEXT,
+    vulnerabilities TEXT,
+    outdated INTEGER,
+    PRIMARY KEY (package_id, run_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS changes_by_run ON changes (run_id);
+"""
+
+# The last change of a package at or before a run: its state as of that run
+STATE_AT = ("SELECT " + ', '.join(STATE_FIELDS) + " FROM changes"
+            " WHERE package_id = ? AND run_id <= ? ORDER BY run_id DESC LIMIT 1")
+
+
+def merge_states(states):
+    "One state for a package listed by several manifests of a repository"
+    if len(states) == 1:
+        return states[0]
+    merged = tuple(' '.join(sorted({value for value in values if value}))
+                   for values in zip(*(state[:-1] for state in states)))
+    return merged + (int(any(state[-1] for state in states)),)
+
+
+def parse_since(value):
+    "A run id, an ISO date or a relative age such as 7d or 12h, as a started_at timestamp or ('run', id)"
+    if value.isdigit():
+        return 'run', int(value)
+    if value[-1:] in ('d', 'h') and value[:-1].isdigit():
+        age = timedelta(days=int(value[:-1])) if value[-1] == 'd' else timedelta(hours=int(value[:-1]))
+        return 'time', time.time() - age.total_seconds()
+    return 'time', datetime.fromisoformat(value).timestamp()
+
+
+class HistoryStore:
+    "Append-only, change-encoded history of resolved results across runs, keyed by (repository, ecosystem, package)"
+
+    def __init__(self, path):
+        "Open (creating if needed) the history database at path"
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def record_run(self, records, label='', started_at=None):
+        """Append a run from normalized report records (see report_writers.report_record).
+
+        Only packages whose state differs from their last recorded one are written. Packages of
+        the repositories in this run that are no longer listed are recorded as removed; other
+        repositories are left untouched, so partial scans do not erase history.
+        Returns (run id, number of changes written)."""
+        states = {}
+        for record in records:
+            state = (record['current_version'], record['latest_version'], record['upgrade_type'],
+                     record['vulnerabilities'], int(bool(record['recommendation'])))
+            states.setdefault((record['repository'], record['ecosystem'], record['name']), []).append(state)
+        repositories = {repository for repository, _, _ in states}
+
+        with self.connection:
+            cursor = self.connection.execute('INSERT INTO runs (started_at, label) VALUES (?, ?)',
+                                             (started_at or time.time(), label))
+            run_id = cursor.lastrowid
+            # Latest state of every package of these repositories, one indexed lookup each
+            known = {}
+            for repository in repositories:
+                for package_id, ecosystem, name, *state in self.connection.execute(
+                        "SELECT p.id, p.ecosystem, p.name, " + ', '.join(f"c.{field}" for field in STATE_FIELDS) +
+                        " FROM packages p LEFT JOIN changes c ON c.package_id = p.id AND c.run_id = p.last_run"
+                        " WHERE p.repository = ?", (repository,)):
+                    known[(repository, ecosystem, name)] = package_id, tuple(state)
+            for key in states.keys() - known.keys():
+                cursor = self.connection.execute('INSERT INTO packages (repository, ecosystem, name) VALUES (?, ?, ?)',
+                                                 key)
+                known[key] = cursor.lastrowid, (None,) * len(STATE_FIELDS)
+
+            changes = []
+            for key, (package_id, previous) in known.items():
+                if key in states:
+                    state = merge_states(states[key])
+                    if state != previous:
+                        changes.append((package_id, run_id) + state)
+                elif previous[0] is not None:
+                    changes.append((package_id, run_id) + (None,) * len(STATE_FIELDS))
+            self.connection.executemany(
+                f"INSERT INTO changes VALUES ({', '.join('?' * (2 + len(STATE_FIELDS)))})", changes)
+            self.connection.executemany('UPDATE packages SET last_run = ? WHERE id = ?',
+                                        [(run_id, change[0]) for change in changes])
+        return run_id, len(changes)
+
+    def runs(self):
+        return [{'run': run_id, 'started_at': started_at, 'label': label}
+                for run_id, started_at, label in self.connection.execute(
+                    'SELECT id, started_at, label FROM runs ORDER BY id')]
+
+    def first_run_after(self, since):
+        "Id of the first run at or after since (see parse_since)"
+        kind, value = since
+        if kind == 'run':
+            return value
+        row = self.connection.execute('SELECT min(id) FROM runs WHERE started_at >= ?', (value,)).fetchone()
+        return row[0] if row[0] is not None else sys.maxsize
+
+    def changes_since(self, since, repository=None):
+        "Every change from the first run at or after since, with the state before it"
+        run_id = self.first_run_after(since)
+        query = ("SELECT c.run_id, p.id, p.repository, p.ecosystem, p.name, "
+                 + ', '.join(f"c.{field}" for field in STATE_FIELDS) +
+                 " FROM changes c JOIN packages p ON p.id = c.package_id WHERE c.run_id >= ?")
+        parameters = [run_id]
+        if repository is not None:
+            query += ' AND p.repository = ?'
+            parameters.append(repository)
+        results = []
+        for run, package_id, repository_name, ecosystem, name, *state in self.connection.execute(
+                query + ' ORDER BY p.repository, p.ecosystem, p.name, c.run_id', parameters):
+            before = self.connection.execute(STATE_AT, (package_id, run - 1)).fetchone()
+            results.append({'run': run, 'repository': repository_name, 'ecosystem': ecosystem, 'name': name,
+                            'before': dict(zip(STATE_FIELDS, before)) if before and before[0] is not None else None,
+                            'after': dict(zip(STATE_FIELDS, state)) if state[0] is not None else None})
+        return results
+
+    def package_history(self, ecosystem, name, repository=None):
+        "Every recorded state of a package, per repository, oldest first"
+        query = ("SELECT p.repository, c.run_id, r.started_at, " + ', '.join(f"c.{field}" for field in STATE_FIELDS) +
+                 " FROM packages p JOIN changes c ON c.package_id = p.id JOIN runs r ON r.id = c.run_id"
+                 " WHERE p.ecosystem = ? AND p.name = ?")
+        parameters = [ecosystem, name]
+        if repository is not None:
+            query += ' AND p.repository = ?'
+            parameters.append(repository)
+        return [{'repository': repository_name, 'run': run, 'started_at': started_at,
+                 **dict(zip(STATE_FIELDS, state))}
+                for repository_name, run, started_at, *state in self.connection.execute(
+                    query + ' ORDER BY p.repository, c.run_id', parameters)]
+
+    def outdated_since(self, ecosystem, name, repository=None):
+        "Per repository, the run from which the package has been continuously outdated (None if it is current)"
+        result = {}
+        for entry in self.package_history(ecosystem, name, repository):
+            if not entry['outdated']:
+                result[entry['repository']] = None
+            elif result.get(entry['repository']) is None:
+                result[entry['repository']] = {'run': entry['run'], 'started_at': entry['started_at']}
+        return result
+
+    def snapshot(self, run_id):
+        "Every package present as of a run, with its state then"
+        results = []
+        for package_id, repository, ecosystem, name in self.connection.execute(
+                'SELECT id, repository, ecosystem, name FROM packages ORDER BY repository, ecosystem, name'):
+            state = self.connection.execute(STATE_AT, (package_id, run_id)).fetchone()
+            if state and state[0] is not None:
+                results.append({'repository': repository, 'ecosystem': ecosystem, 'name': name,
+                                **dict(zip(STATE_FIELDS, state))})
+        return results
+
+    def close(self):
+        self.connection.close()
+
+
+def history_records(dependencies, rows, repository=''):
+    "Normalized records for (index, row) results of a scan, for record_run; repository fills in rows without one"
+    for index, row in rows:
+        record = report_record(dependencies[index], row)
+        if not record['repository']:
+            record['repository'] = repository
+        yield record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the dependency history recorded by main.py --history")
+    parser.add_argument('history', help="history database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('runs', help="list recorded runs")
+    changes_parser = subparsers.add_parser('changes', help="what changed since a run, date (2026-10-01) or age (7d)")
+    changes_parser.add_argument('since')
+    changes_parser.add_argument('--repository')
+    package_parser = subparsers.add_parser('package', help="history of one package")
+    package_parser.add_argument('ecosystem', choices=['maven', 'pypi', 'rubygems'])
+    package_parser.add_argument('name', help="package name; Maven names are group:artifact")
+    package_parser.add_argument('--repository')
+    outdated_parser = subparsers.add_parser('outdated-since', help="when a package became outdated, per repository")
+    outdated_parser.add_argument('ecosystem', choices=['maven', 'pypi', 'rubygems'])
+    outdated_parser.add_argument('name')
+    outdated_parser.add_argument('--repository')
+    snapshot_parser = subparsers.add_parser('snapshot', help="every package as of a run")
+    snapshot_parser.add_argument('run', type=int)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.history)
+    if args.command == 'runs':
+        result = store.runs()
+    elif args.command == 'changes':
+        result = store.changes_since(parse_since(args.since), args.repository)
+    elif args.command == 'package':
+        result = store.package_history(args.ecosystem, args.name, args.repository)
+    elif args.command == 'outdated-since':
+        result = store.outdated_since(args.ecosystem, args.name, args.repository)
+    else:
+        result = store.snapshot(args.run)
+    store.close()
+    json.dump(result, sys.stdout, indent=2)
+    print()
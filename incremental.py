@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+
+from manifest_parsers import Dependency
+
+STATE_VERSION = 1
+
+
+def file_fingerprint(path):
+    "Size, modification time and SHA-256 of a file"
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def source_fingerprint(path):
+    "Fingerprint of an input such as an advisory dump: one file, or every file under a directory"
+    if not os.path.isdir(path):
+        return file_fingerprint(path)
+    fingerprints = {}
+    for directory, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(directory, name)
+            fingerprints[os.path.relpath(file_path, path)] = file_fingerprint(file_path)
+    return dict(sorted(fingerprints.items()))
+
+
+def dependency_fingerprint(dependency):
+    return f"{dependency.ecosystem}\0{dependency.name}\0{dependency.version or ''}"
+
+
+class ScanState:
+    "Sidecar state of the previous run: manifest fingerprints, their dependencies and resolved rows"
+
+    def __init__(self, path, settings=None):
+        "Load the previous state; it is discarded if it was produced with different settings"
+        self.path = path
+        self.settings = settings or {}
+        self.manifests = {}
+        self.rows = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('version') == STATE_VERSION and state.get('settings') == self.settings:
+                self.manifests = state.get('manifests', {})
+                self.rows = state.get('rows', {})
+        self.next_manifests = {}
+
+    def manifest_unchanged(self, path):
+        "True if path is byte-for-byte the manifest seen last run"
+        previous = self.manifests.get(path)
+        if previous is None or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        if stat.st_size != previous['size']:
+            return False
+        if stat.st_mtime_ns == previous['mtime_ns']:
+            return True
+        # Touched but possibly not modified, so compare contents
+        return file_fingerprint(path)['sha256'] == previous['sha256']
+
+    def is_current(self, manifest_paths, output_path):
+        "True if no manifest changed since the run that wrote output_path"
+        return (os.path.exists(output_path)
+                and set(manifest_paths) == set(self.manifests)
+                and all(self.manifest_unchanged(path) for path in manifest_paths))
+
+    def dependencies(self, path, parse):
+        "Return the dependencies of a manifest, re-parsing it only if it changed"
+        if self.manifest_unchanged(path):
+            dependencies = [Dependency(*fields) for fields in self.manifests[path]['dependencies']]
+        else:
+            dependencies = list(parse(path))
+        self.next_manifests[path] = dict(file_fingerprint(path), dependencies=[list(d) for d in dependencies])
+        return dependencies
+
+    def cached_row(self, dependency):
+        # A copy, since the same package may appear in several manifests
+        row = self.rows.get(dependency_fingerprint(dependency))
+        return dict(row) if row is not None else None
+
+    def save(self, dependencies, rows):
+        "Record the manifests read this run and the row resolved for each dependency"
+        self.manifests = self.next_manifests
+        self.rows = {dependency_fingerprint(dependency): row for dependency, row in zip(dependencies, rows)}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'version': STATE_VERSION, 'settings': self.settings,
+                       'manifests': self.manifests, 'rows': self.rows}, file)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,114 @@
+import threading
+import time
+import uuid
+
+from resolution_planner import ResolutionPlan
+
+# Finished jobs are kept this long (seconds) so clients can collect their results
+JOB_RETENTION = 60 * 60
+
+# Yielded by Job.stream when nothing resolved within the heartbeat interval
+HEARTBEAT = 'heartbeat'
+
+
+class Job:
+    "One /process upload whose dependencies resolve in the background"
+
+    def __init__(self, rows):
+        "rows are the manifest fields of each dependency, in upload order"
+        self.id = uuid.uuid4().hex
+        self.rows = rows
+        self.results = [None] * len(rows)
+        self.completed = 0
+        self.failed = 0
+        self.status = 'running' if rows else 'done'
+        self.finished_at = None if rows else time.time()
+        # Resolved (index, result) pairs in completion order, for streaming
+        self.events = []
+        self.condition = threading.Condition()
+
+    def resolved(self, index, future):
+        "Done-callback for the lookup of the dependency at index"
+        try:
+            stable_version = future.result()
+        except Exception:
+            stable_version = None
+            failed = 1
+        else:
+            failed = 0
+        result = self.rows[index] + (stable_version,) if stable_version else None
+        with self.condition:
+            self.results[index] = result
+            self.events.append((index, result))
+            self.completed += 1
+            self.failed += failed
+            if self.completed == len(self.rows):
+                self.status = 'done'
+                self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def summary(self):
+        with self.condition:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'total': len(self.rows),
+                'completed': self.completed,
+                'failed': self.failed,
+                'results': [result for result in self.results if result is not None],
+            }
+
+    def stream(self, heartbeat=15):
+        "Yield (index, result) pairs as they resolve, HEARTBEAT while idle, then None once the job is done"
+        position = 0
+        while True:
+            with self.condition:
+                while position == len(self.events) and self.status != 'done':
+                    if not self.condition.wait(timeout=heartbeat):
+                        break
+                events = self.events[position:]
+                done = self.status == 'done' and position + len(events) == len(self.events)
+            position += len(events)
+            for event in events:
+                yield event
+            if done:
+                yield None
+                return
+            if not events:
+                # Lets the server notice clients that went away
+                yield HEARTBEAT
+
+
+class JobQueue:
+    "Runs uploads as background jobs, resolving them through the app's shared ResolverService"
+
+    def __init__(self, resolver):
+        "resolver is a ResolverService; jobs for the same coordinates share its cache and in-flight lookups"
+        self.resolver = resolver
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, pending):
+        "Start a job for a list of (Dependency, row) pairs and return it"
+        self.prune()
+        job = Job([row for _, row in pending])
+        with self.lock:
+            self.jobs[job.id] = job
+
+        plan = ResolutionPlan()
+        keys = [plan.add(dependency.ecosystem, dependency.name) for dependency, _ in pending]
+        futures = {key: self.resolver.lookup(key, name) for key, name in plan.names.items()}
+        for index, key in enumerate(keys):
+            futures[key].add_done_callback(lambda future, index=index: job.resolved(index, future))
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        with self.lock:
+            for job_id in [job_id for job_id, job in self.jobs.items()
+                           if job.finished_at is not None and job.finished_at < cutoff]:
+                del self.jobs[job_id]
@@ -0,0 +1,161 @@
+import json
+import re
+
+from manifest_parsers import Dependency, open_manifest
+from scan_metrics import metrics
+
+# Gemfile.lock spec lines, indented exactly four spaces: "    rails (7.0.4)" / "    nokogiri (1.15.4-x86_64-linux)"
+GEM_SPEC = re.compile(r'^ {4}([^ (]+) \(([^)]+)\)$')
+
+# Maven scopes that end a resolved coordinate in `mvn dependency:list` output
+MAVEN_SCOPES = {'compile', 'provided', 'runtime', 'test', 'system', 'import'}
+
+# Poetry sources that are not a package index
+POETRY_LOCAL_SOURCES = {'git', 'directory', 'file', 'url'}
+
+
+def toml_string(value):
+    "Value of a single-line TOML basic or literal string, e.g. '\"1.0\"' -> '1.0'"
+    value = value.strip()
+    if value[:1] == '"':
+        return json.loads(value)
+    return value.strip("'")
+
+
+def poetry_dependency(package):
+    "Dependency for a finished [[package]] table, or None if it is incomplete or not from an index"
+    if package and package.get('name') and package.get('version') and package.get('type') not in POETRY_LOCAL_SOURCES:
+        return Dependency('pypi', package['name'], package['version'])
+    return None
+
+
+@metrics.instrumented('parse', 'gemfile_lock')
+def parse_gemfile_lock(source):
+    "Yield Dependency records for the gems resolved from rubygems in a Gemfile.lock (GEM section specs)"
+    with open_manifest(source) as file:
+        in_gem_section = False
+        previous = None
+        for line in file:
+            if not line.startswith(' '):
+                # Top-level section headers: GEM, GIT, PATH, PLATFORMS, DEPENDENCIES, ...
+                in_gem_section = line.rstrip() == 'GEM'
+                continue
+            # Nested requirement lines are indented six spaces and skipped without a regex
+            if not in_gem_section or line[4:5] == ' ':
+                continue
+            match = GEM_SPEC.match(line.rstrip())
+            if match:
+                # Platform-specific builds (1.15.4-x86_64-linux) are listed once per platform
+                name, version = match.group(1), match.group(2).split('-', 1)[0]
+                if (name, version) != previous:
+                    previous = name, version
+                    yield Dependency('rubygems', name, version)
+
+
+@metrics.instrumented('parse', 'poetry_lock')
+def parse_poetry_lock(source):
+    "Yield Dependency records from the [[package]] tables of a poetry.lock, reading only name, version and source type"
+    with open_manifest(source) as file:
+        package = None
+        table = None
+        for line in file:
+            if line.startswith('['):
+                header = line.strip()
+                if header == '[[package]]' or not header.startswith('[package.'):
+                    # A new top-level table ends the package before it
+                    dependency = poetry_dependency(package)
+                    if dependency:
+                        yield dependency
+                    package = {} if header == '[[package]]' else None
+                table = header
+                continue
+            if package is None:
+                continue
+            if table == '[[package]]':
+                if line.startswith('name = '):
+                    package['name'] = toml_string(line[7:])
+                elif line.startswith('version = '):
+                    package['version'] = toml_string(line[10:])
+            elif table == '[package.source]' and line.startswith('type = '):
+                package['type'] = toml_string(line[7:])
+        dependency = poetry_dependency(package)
+        if dependency:
+            yield dependency
+
+
+@metrics.instrumented('parse', 'pipfile_lock')
+def parse_pipfile_lock(source):
+    "Yield Dependency records from the default and develop sections of a Pipfile.lock"
+    with open_manifest(source) as file:
+        opening = file.readline()
+        if opening.strip() != '{':
+            # Not pipenv's one-key-per-line layout: fall back to loading the whole document
+            data = json.loads(opening + file.read())
+            for section in ('default', 'develop'):
+                for name, entry in (data.get(section) or {}).items():
+                    if isinstance(entry, dict) and entry.get('version'):
+                        yield Dependency('pypi', name, entry['version'].lstrip('='))
+            return
+
+        # pipenv writes one key per line, so the path of keys can be followed line by line
+        # without building the document; hash lists, which are most of the file, are skipped
+        path = []
+        seen = set()
+        for line in file:
+            line = line.strip()
+            first = line[:1]
+            if first == '"':
+                key, separator, value = line.partition('": ')
+                if not separator:
+                    # List item, e.g. a hash
+                    continue
+                if value[-1:] in ('{', '['):
+                    path.append(key[1:])
+                elif key == '"version' and len(path) == 2 and path[0] in ('default', 'develop'):
+                    version = json.loads(value.rstrip(',')).lstrip('=')
+                    # Packages needed at run time are usually listed under develop as well
+                    if (path[1], version) not in seen:
+                        seen.add((path[1], version))
+                        yield Dependency('pypi', path[1], version)
+            elif first in ('}', ']'):
+                if not path:
+                    # Closing brace of the document itself
+                    break
+                path.pop()
+            elif line in ('{', '['):
+                # Anonymous object in a list, e.g. _meta.sources
+                path.append(None)
+
+
+@metrics.instrumented('parse', 'gradle_lockfile')
+def parse_gradle_lockfile(source):
+    "Yield Dependency records from a gradle.lockfile (group:artifact:version=configurations)"
+    with open_manifest(source) as file:
+        for line in file:
+            if line.startswith('#') or line.startswith('empty='):
+                continue
+            # Per-configuration lockfiles from Gradle 6 and earlier have no '=' part
+            coordinates = line.split('=', 1)[0].strip()
+            parts = coordinates.split(':')
+            if len(parts) == 3:
+                yield Dependency('maven', f"{parts[0]}:{parts[1]}", parts[2])
+
+
+@metrics.instrumented('parse', 'maven_dependency_list')
+def parse_maven_dependency_list(source):
+    "Yield Dependency records from `mvn dependency:list` output, console log or -DoutputFile"
+    with open_manifest(source) as file:
+        seen = set()
+        for line in file:
+            if line.startswith('[INFO]'):
+                line = line[6:]
+            # group:artifact:type[:classifier]:version:scope, optionally followed by " -- module ..." or " (optional)"
+            coordinates = line.strip().split(' ', 1)[0]
+            parts = coordinates.split(':')
+            if len(parts) not in (5, 6) or parts[-1] not in MAVEN_SCOPES:
+                continue
+            # Multi-module builds list shared dependencies once per module, possibly in other scopes
+            dependency = Dependency('maven', f"{parts[0]}:{parts[1]}", parts[-2])
+            if dependency not in seen:
+                seen.add(dependency)
+                yield dependency
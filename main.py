@@ -1,250 +1,339 @@
-import csv
-import xml.etree.ElementTree as ET
-import requests
-from importlib.metadata import distribution
-import yaml
-
-
-def read_pom_file(file_path):
-    dependencies = []
-
-    # Parse XML file
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-
-    # Find dependencies
-    for dependency in root.findall('.//{http://maven.apache.org/POM/4.0.0}dependency'):
-        group_id = dependency.find('{http://maven.apache.org/POM/4.0.0}groupId').text
-        artifact_id = dependency.find('{http://maven.apache.org/POM/4.0.0}artifactId').text
-
-        # Get the current stable version from Maven Central
-        stable_version = get_stable_version_maven(group_id, artifact_id)
-
-        recommendation = ''
-        if stable_version and stable_version != dependency.find('{http://maven.apache.org/POM/4.0.0}version').text:
-            recommendation = f"Upgrade {group_id}:{artifact_id} from {dependency.find('{http://maven.apache.org/POM/4.0.0}version').text} to {stable_version}"
-
-        dependencies.append({
-            'group_id': group_id,
-            'artifact_id': artifact_id,
-            'old_version': dependency.find('{http://maven.apache.org/POM/4.0.0}version').text,
-            'new_version': stable_version if stable_version else 'Not found',
-            'recommendation': recommendation
-        })
-
-    return dependencies
-
-
-def read_requirements_file(file_path):
-    dependencies = []
-
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                dependency = line.split('==')
-                package_name = dependency[0]
-
-                # Get the current stable version from PyPI
-                stable_version = get_stable_version_pip(package_name)
-
-                recommendation = ''
-                if stable_version and stable_version != dependency[1]:
-                    recommendation = f"Upgrade {package_name} from {dependency[1]} to {stable_version}"
-
-                dependencies.append({
-                    'package_name': package_name,
-                    'old_version': dependency[1] if len(dependency) > 1 else 'Not specified',
-                    'new_version': stable_version if stable_version else 'Not found',
-                    'recommendation': recommendation
-                })
-
-    return dependencies
-
-
-def read_gemfile(file_path):
-    dependencies = []
-
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            line = line.strip()
-            if line.startswith("gem"):
-                parts = line.split("'")
-                if len(parts) >= 2:
-                    gem_name = parts[1]
-                    if len(parts) >= 4:
-                        stable_version = get_stable_version_gem(gem_name)
-                        recommendation = ''
-                        if stable_version and stable_version != parts[3]:
-                            recommendation = f"Upgrade {gem_name} from {parts[3]} to {stable_version}"
-
-                        dependencies.append({
-                            'gem_name': gem_name,
-                            'old_version': parts[3] if len(parts) > 3 else 'Not specified',
-                            'new_version': stable_version if stable_version else 'Not found',
-                            'recommendation': recommendation
-                        })
-                    else:
-                        print(f"Warning: No version specified for {gem_name}.")
-                else:
-                    print(f"Warning: Malformed line in Gemfile - {line}")
-
-    return dependencies
-
-
-def get_stable_version_maven(group_id, artifact_id):
-    # Construct Maven Central URL
-    url = f"https://search.maven.org/solrsearch/select?q=g:\"{group_id}\"+AND+a:\"{artifact_id}\"&core=gav&rows=20&wt=json"
-
-    # Fetch data from Maven Central
-    response = requests.get(url)
-    data = response.json()
-
-    # Extract stable version from response
-    if data['response']['numFound'] > 0:
-        latest_version = data['response']['docs'][0]['v']
-        return latest_version
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import maven_metadata
+import parser_registry
+import registry_cache
+import registry_lookups
+import report_writers
+import version_ordering
+from registry_lookups import LOOKUPS
+from resolution_planner import ResolutionPlan
+from scan_metrics import metrics
+
+# Maximum number of registry lookups in flight at once
+MAX_WORKERS = int(os.environ.get('DEPENDENCY_ANALYSER_WORKERS', '16'))
+
+# Lockfiles picked up from the working directory alongside the fixed manifests
+LOCKFILES = ('Gemfile.lock', 'poetry.lock', 'Pipfile.lock', 'gradle.lockfile', 'dependency-list.txt')
+
+
+def dependency_row(dependency):
+    # CSV fields known from the manifest itself
+    if dependency.ecosystem == 'maven':
+        row = {'group_id': dependency.group_id, 'artifact_id': dependency.artifact_id}
+    elif dependency.ecosystem == 'pypi':
+        row = {'package_name': dependency.name}
     else:
-        return None
+        row = {'gem_name': dependency.name}
+    row['old_version'] = dependency.version if dependency.version else 'Not specified'
+    return row
+
+
+def resolved_row(dependency, stable_version):
+    row = dependency_row(dependency)
+    recommendation = ''
+    upgrade_type = ''
+    if stable_version and version_ordering.is_newer(dependency.ecosystem, stable_version, row['old_version']):
+        recommendation = f"Upgrade {dependency.name} from {row['old_version']} to {stable_version}"
+        upgrade_type = version_ordering.upgrade_kind(dependency.ecosystem, dependency.version, stable_version)
+
+    row['new_version'] = stable_version if stable_version else 'Not found'
+    row['recommendation'] = recommendation
+    row['upgrade_type'] = upgrade_type
+    return row
+
+
+def resolved_rows(dependencies, executor, plan=None):
+    # Look up every unique coordinate once, yielding (index, row) as soon as each lookup finishes
+    if plan is None:
+        plan = ResolutionPlan()
+    dependencies = list(dependencies)
+    waiting = {}
+    for index, dependency in enumerate(dependencies):
+        waiting.setdefault(plan.add(dependency.ecosystem, dependency.name), []).append(index)
+
+    for key, stable_version in plan.resolve_as_completed(LOOKUPS, executor):
+        if not stable_version:
+            metrics.increment('lookup_not_found', key[0])
+        for index in waiting.pop(key):
+            yield index, resolved_row(dependencies[index], stable_version)
+
+
+def resolve_dependencies(dependencies, executor=None, plan=None):
+    # Resolve every dependency and return the rows in input order
+    dependencies = list(dependencies)
+    rows = [None] * len(dependencies)
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as own_executor:
+            for index, row in resolved_rows(dependencies, own_executor, plan):
+                rows[index] = row
+    else:
+        for index, row in resolved_rows(dependencies, executor, plan):
+            rows[index] = row
+    return rows
 
-def get_stable_version_pip(package_name):
-    # Construct PyPI JSON API URL
-    url = f"https://pypi.org/pypi/{package_name}/json"
 
-    # Fetch data from PyPI
-    response = requests.get(url)
+def read_pom_file(file_path, executor=None):
+    return resolve_dependencies(parser_registry.parse('pom', file_path), executor)
 
-    # Check if the package exists
-    if response.status_code == 200:
-        data = response.json()
-        # Extract stable version from the JSON response
-        return data["info"]["version"]
-    else:
-        return None
 
+def read_requirements_file(file_path, executor=None):
+    return resolve_dependencies(parser_registry.parse('requirements', file_path), executor)
 
-def get_stable_version_gem(gem_name):
-    # Construct RubyGems API URL
-    url = f"https://rubygems.org/api/v1/versions/{gem_name}.json"
 
-    # Fetch data from RubyGems
-    response = requests.get(url)
-    data = response.json()
+def read_gemfile(file_path, executor=None):
+    return resolve_dependencies(parser_registry.parse('gemfile', file_path), executor)
 
-    # Extract stable version from response
-    if data:
-        # Filtering out non-integer characters from version strings
-        versions = [version['number'] for version in data]
-        filtered_versions = [v for v in versions if all(c.isdigit() or c == '.' for c in v)]
 
-        # Selecting the latest version after filtering
-        if filtered_versions:
-            stable_version = max(filtered_versions, key=lambda v: tuple(map(int, v.split('.'))))
-            return stable_version
-    return None
+def read_build_gradle(file_path, executor=None):
+    return resolve_dependencies(parser_registry.parse('build_gradle', file_path), executor)
 
-def read_build_gradle(file_path):
-    dependencies = []
 
-    with open(file_path, 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            line = line.strip()
-            if line.startswith("implementation"):
-                parts = line.split("'")
-                group_id = parts[1]
-                artifact_id = parts[3]
-                if len(parts) >= 6:
-                    stable_version = get_stable_version_gradle(group_id, artifact_id)
-                    recommendation = ''
-                    if stable_version and stable_version != parts[5]:
-                        recommendation = f"Upgrade {group_id}:{artifact_id} from {parts[5]} to {stable_version}"
-
-                    dependencies.append({
-                        'group_id': group_id,
-                        'artifact_id': artifact_id,
-                        'old_version': parts[5] if len(parts) > 5 else 'Not specified',
-                        'new_version': stable_version if stable_version else 'Not found',
-                        'recommendation': recommendation
-                    })
-                else:
-                    print(f"Warning: No version specified for {group_id}:{artifact_id}.")
-
-    return dependencies
-
-
-def get_stable_version_gradle(group_id, artifact_id):
-    # Construct Maven Central URL
-    url = f"https://search.maven.org/solrsearch/select?q=g:\"{group_id}\"+AND+a:\"{artifact_id}\"&core=gav&rows=20&wt=json"
-
-    # Fetch data from Maven Central
-    response = requests.get(url)
-    data = response.json()
-
-    # Extract stable version from response
-    if data['response']['numFound'] > 0:
-        latest_version = data['response']['docs'][0]['v']
-        return latest_version
-    else:
-        return None
+def read_yaml_file(file_path, executor=None):
+    return resolve_dependencies(parser_registry.parse('yaml', file_path), executor)
 
-def read_yaml_file(file_path):
-    with open(file_path, 'r') as file:
-        data = yaml.safe_load(file)
 
-    dependencies = []
-    for dependency in data.get('dependencies', []):
-        if 'name' in dependency:
-            name = dependency['name']
-            if 'version' in dependency:
-                stable_version = get_stable_version_gem(name)
-                recommendation = ''
-                if stable_version and stable_version != dependency['version']:
-                    recommendation = f"Upgrade {name} from {dependency['version']} to {stable_version}"
-
-                dependencies.append({
-                    'gem_name': name,
-                    'old_version': dependency['version'],
-                    'new_version': stable_version if stable_version else 'Not found',
-                    'recommendation': recommendation
-                })
-            else:
-                print(f"Warning: No version specified for {name} in the YAML file.")
-
-    return dependencies
-
-
-def write_to_csv(data, csv_file):
-    with open(csv_file, 'w', newline='') as file:
-        fieldnames = ['group_id', 'artifact_id', 'old_version', 'new_version', 'package_name', 'gem_name',
-                      'recommendation']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
+@metrics.instrumented('report', 'legacy-csv')
+def write_to_csv(data, csv_file, leading_fields=()):
+    with report_writers.LegacyCsvReportWriter(csv_file, leading_fields) as report:
         for row in data:
-            writer.writerow(row)
+            report.write(None, row)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check dependencies against their latest stable versions")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help="maximum number of concurrent registry lookups")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="ignore the on-disk registry response cache")
+    parser.add_argument('--maven-repository', default=maven_metadata.repository_url,
+                        help="Maven repository (http(s):// or file://) to read maven-metadata.xml from")
+    parser.add_argument('--maven-backend', choices=['metadata', 'search'], default='metadata',
+                        help="resolve Maven coordinates from maven-metadata.xml or the search.maven.org API")
+    parser.add_argument('--offline', metavar='INDEX',
+                        help="resolve versions from a snapshot built by offline_index.py instead of the network")
+    parser.add_argument('--advisories', metavar='PATH',
+                        help="flag known vulnerabilities using an OSV dump or an index built by vulnerability_check.py")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only resolve dependencies that changed since the previous run")
+    parser.add_argument('--state', help="state file for --incremental (default: <output csv>.state.json)")
+    parser.add_argument('--manifest', action='append', default=[], metavar='[TYPE=]PATH',
+                        help="also scan this file; the type (e.g. yaml, poetry_lock) is detected from the name if omitted")
+    parser.add_argument('--repos', nargs='+', metavar='PATH',
+                        help="scan every manifest found under these directories into one report")
+    parser.add_argument('--repo-list', metavar='FILE', help="file listing repository paths to scan, one per line")
+    parser.add_argument('--processes', type=int, help="worker processes used to parse manifests in batch mode")
+    parser.add_argument('--format', choices=sorted(report_writers.REPORT_WRITERS), default='legacy-csv',
+                        help="report format; all but legacy-csv are written row by row as lookups finish")
+    parser.add_argument('--output', help="report file (default: dependency_versions.<format extension>)")
+    parser.add_argument('--transitive', type=int, default=0, metavar='DEPTH',
+                        help="also check dependencies pulled in up to DEPTH levels below the manifests")
+    parser.add_argument('--history', metavar='PATH',
+                        help="append this run's results to a history database (see history_store.py)")
+    parser.add_argument('--history-label', default='', help="label stored with the run in --history")
+    parser.add_argument('--history-repository', metavar='NAME',
+                        help="repository the results are recorded under in --history outside --repos mode "
+                             "(default: the absolute path of the working directory)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="write a JSON summary of stage timings, cache hit rates, bytes and errors ('-' for stdout)")
+    parser.add_argument('--profile', metavar='PATH', help="profile the run with cProfile and write the stats to PATH")
+    args = parser.parse_args()
+    # Optional features import their modules only when enabled, to keep start-up fast
+    profiler = None
+    if args.profile:
+        from scan_metrics import ThreadProfiler
+        profiler = ThreadProfiler()
+    # Worker threads are only profiled if they start the profiler themselves
+    thread_initializer = profiler.profile_thread if profiler else None
+    if args.no_cache:
+        registry_cache.cache_enabled = False
+    maven_metadata.repository_url = args.maven_repository
+    if args.maven_backend == 'search':
+        registry_lookups.use_maven_search()
+    if args.offline:
+        registry_lookups.use_offline_index(args.offline)
+
     pom_file = "pom.xml"
     requirements_file = "requirements.txt"
     gemfile = "Gemfile"
     build_gradle = "build.gradle"
     yaml_file = "travis.yaml"
-    output_csv = "dependency_versions.csv"
-
-    maven_dependencies = read_pom_file(pom_file)
-    pip_dependencies = read_requirements_file(requirements_file)
-    gem_dependencies = read_gemfile(gemfile)
-    gradle_dependencies = read_build_gradle(build_gradle)
-    # yaml_dependencies = read_yaml_file(yaml_file)
-
-    all_dependencies = (
-            maven_dependencies +
-            pip_dependencies +
-            gem_dependencies +
-            gradle_dependencies
-        # yaml_dependencies
-    )
-    write_to_csv(all_dependencies, output_csv)
+    output_csv = args.output or f"dependency_versions.{report_writers.REPORT_EXTENSIONS[args.format]}"
+
+    manifests = [
+        (pom_file, partial(parser_registry.parse, 'pom')),
+        (requirements_file, partial(parser_registry.parse, 'requirements')),
+        (gemfile, partial(parser_registry.parse, 'gemfile')),
+        (build_gradle, partial(parser_registry.parse, 'build_gradle')),
+        # (yaml_file, partial(parser_registry.parse, 'yaml')),
+    ]
+    # Lockfiles next to the manifests are scanned too when present
+    manifests.extend((name, partial(parser_registry.parse, parser_registry.detect(name)))
+                     for name in LOCKFILES if os.path.exists(name))
+    if args.manifest:
+        # Plugin types can be named on the command line too
+        parser_registry.load_plugins()
+    for manifest in args.manifest:
+        kind, separator, path = manifest.partition('=')
+        if not separator or kind not in parser_registry.registry:
+            kind, path = parser_registry.detect(manifest), manifest
+        if kind is None:
+            parser.error(f"no parser for {manifest}; give its type as TYPE=PATH")
+        manifests.append((path, partial(parser_registry.parse, kind)))
+
+    batch = bool(args.repos or args.repo_list)
+    if batch:
+        import batch_scan
+        repository_roots = (args.repos or []) + (batch_scan.read_repository_list(args.repo_list) if args.repo_list else [])
+        discovered = batch_scan.discover_manifests(repository_roots)
+        repository_of = {path: repository for repository, path in discovered}
+        manifests = [(path, partial(parser_registry.parse, parser_registry.detect(path))) for _, path in discovered]
+        print(f"Found {len(manifests)} manifests in {len(set(repository_of.values()))} repositories")
+
+    state = None
+    if args.incremental:
+        from incremental import ScanState, source_fingerprint
+        # Results depend on where versions come from, so a change there invalidates the state
+        state = ScanState(args.state or f"{output_csv}.state.json", {
+            'maven_repository': args.maven_repository,
+            'maven_backend': args.maven_backend,
+            'offline': args.offline,
+            'transitive': args.transitive,
+            'format': args.format,
+            # A new or updated advisory dump changes the vulnerabilities column
+            'advisories': {'path': os.path.abspath(args.advisories), 'fingerprint': source_fingerprint(args.advisories)}
+            if args.advisories else None,
+        })
+        if state.is_current([path for path, _ in manifests], output_csv):
+            print(f"No manifest changed; {output_csv} is up to date")
+            sys.exit(0)
+
+    if batch:
+        # Parsing is CPU-bound, so it is spread over processes; lookups still share one plan below
+        with metrics.timed('parse', 'batch'):
+            parsed = batch_scan.parse_manifests(
+                [path for path, _ in manifests if state is None or not state.manifest_unchanged(path)], args.processes)
+        manifests = [(path, parsed.__getitem__) for path, _ in manifests]
+
+    # Collect every coordinate first so that each unique one is looked up once
+    origins = []
+    dependencies = []
+    for path, parse in manifests:
+        manifest_dependencies = list(parse(path) if state is None else state.dependencies(path, parse))
+        dependencies.extend(manifest_dependencies)
+        if batch:
+            origins.extend([(repository_of[path], os.path.relpath(path, repository_of[path]))]
+                           * len(manifest_dependencies))
+
+    # Transitive dependency -> its graph node; the introduced_by text is only built for the rows written
+    graph = None
+    transitive_nodes = {}
+    if args.transitive:
+        from dependency_graph import GraphResolver
+        from manifest_parsers import Dependency
+        # Each shared subtree is expanded once, however many manifest entries reach it
+        resolver = GraphResolver(LOOKUPS, max_depth=args.transitive, repository=args.maven_repository)
+        with ThreadPoolExecutor(max_workers=args.workers, initializer=thread_initializer) as graph_executor:
+            graph = resolver.resolve(dependencies, graph_executor)
+        roots = set(graph.roots)
+        for node_id, node in enumerate(graph.nodes):
+            if node_id not in roots:
+                dependency = Dependency(*node)
+                dependencies.append(dependency)
+                transitive_nodes[dependency] = node_id
+        # Built once here, as rows may be finished on several threads
+        graph.build_reverse_index()
+        print(f"Found {len(graph) - len(roots)} transitive dependencies"
+              + (" (graph truncated)" if graph.truncated else ""))
+
+    advisory_index = None
+    if args.advisories:
+        from vulnerability_check import AdvisoryIndex
+        advisory_index = AdvisoryIndex.load(args.advisories)
+
+    def finish_row(index, row):
+        dependency = dependencies[index]
+        node_id = transitive_nodes.get(dependency)
+        row['introduced_by'] = graph.introduced_by(node_id) if node_id is not None else ''
+        if batch:
+            # Transitive entries come after the manifests' own and have no manifest of their own
+            row['repository'], row['manifest'] = origins[index] if index < len(origins) else ('', '')
+        if advisory_index is not None:
+            # Checked against the local advisory index, no network needed
+            row['vulnerabilities'] = ' '.join(advisory.id for advisory in advisory_index.matches(
+                dependency.ecosystem, dependency.name, dependency.version))
+        return row
+
+    if state is None:
+        pending = list(range(len(dependencies)))
+    else:
+        pending = [index for index, dependency in enumerate(dependencies) if state.cached_row(dependency) is None]
+
+    # The legacy layout is written in manifest order once everything resolved; the other
+    # formats stream each row out as soon as its lookup finishes
+    streaming = args.format != 'legacy-csv'
+    rows = [None] * len(dependencies) if state is not None or not streaming else None
+    history_rows = [] if args.history else None
+    leading_fields = ('repository', 'manifest') if batch else ()
+    plan = ResolutionPlan()
+    with report_writers.open_report(args.format, output_csv, leading_fields) as report:
+        def emit(index, row):
+            finish_row(index, row)
+            if streaming:
+                with metrics.timed('report', args.format):
+                    report.write(dependencies[index], row)
+            if rows is not None:
+                rows[index] = row
+            if history_rows is not None:
+                history_rows.append((index, row))
+
+        if state is not None:
+            # Unchanged entries come straight from the previous run
+            for index, dependency in enumerate(dependencies):
+                row = state.cached_row(dependency)
+                if row is not None:
+                    emit(index, row)
+            print(f"Reused {len(dependencies) - len(pending)} results from the previous run")
+
+        with ThreadPoolExecutor(max_workers=args.workers, initializer=thread_initializer) as lookup_executor:
+            for position, row in resolved_rows([dependencies[index] for index in pending], lookup_executor, plan):
+                emit(pending[position], row)
+        print(f"Resolved {plan.requested} dependencies with {len(plan.names)} lookups "
+              f"({plan.saved_lookups} duplicate lookups saved)")
+
+        if not streaming:
+            with metrics.timed('report', args.format):
+                for index, row in enumerate(rows):
+                    report.write(dependencies[index], row)
+
+    if state is not None:
+        state.save(dependencies, rows)
+
+    if history_rows is not None:
+        from history_store import HistoryStore, history_records
+        # Only results that differ from the previous run are stored
+        history = HistoryStore(args.history)
+        with metrics.timed('history', 'record'):
+            # Outside batch mode rows carry no repository; without one, every project scanned into the
+            # same history would share '' and mark the others' packages as removed
+            repository = '' if batch else (args.history_repository or os.path.abspath('.'))
+            run_id, changed = history.record_run(history_records(dependencies, history_rows, repository),
+                                                 args.history_label)
+        history.close()
+        print(f"Recorded run {run_id} in {args.history} ({changed} changes)")
+
+    if args.metrics:
+        summary = json.dumps(metrics.summary(), indent=2)
+        if args.metrics == '-':
+            print(summary)
+        else:
+            with open(args.metrics, 'w', encoding='utf-8') as file:
+                file.write(summary)
+    if profiler is not None:
+        profiler.dump(args.profile)
+        print(f"Profile written to {args.profile} (python -m pstats {args.profile})")
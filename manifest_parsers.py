@@ -0,0 +1,138 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from contextlib import contextmanager
+
+from scan_metrics import metrics
+
+# Gemfile lines such as: gem 'rails', '~> 7.0'  /  gem "rake"
+GEM_LINE = re.compile(r'''^gem\s+['"]([^'"]+)['"](?:\s*,\s*['"]([^'"]+)['"])?''')
+
+# Leading distribution name of a requirement, without extras or specifiers
+REQUIREMENT_NAME = re.compile(r'[A-Za-z0-9._-]+')
+
+
+class Dependency(namedtuple('Dependency', ['ecosystem', 'name', 'version'])):
+    "A single dependency declared in a manifest; Maven names are group:artifact"
+    __slots__ = ()
+
+    @property
+    def group_id(self):
+        return self.name.split(':', 1)[0] if self.ecosystem == 'maven' else ''
+
+    @property
+    def artifact_id(self):
+        return self.name.split(':', 1)[1] if self.ecosystem == 'maven' else ''
+
+
+@contextmanager
+def open_manifest(source, mode='r'):
+    "Open a path, or wrap an already open (text or binary) file object, for reading"
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb' if mode == 'rb' else 'r', encoding=None if mode == 'rb' else 'utf-8') as file:
+            yield file
+    elif mode == 'r' and isinstance(source.read(0), bytes):
+        # Uploaded files (e.g. werkzeug FileStorage streams) are binary
+        wrapper = io.TextIOWrapper(source, encoding='utf-8')
+        try:
+            yield wrapper
+        finally:
+            # Leave the caller's stream open
+            wrapper.detach()
+    else:
+        yield source
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+@metrics.instrumented('parse', 'pom')
+def parse_pom(source):
+    "Yield Dependency records from a POM, clearing elements as soon as they are consumed"
+    with open_manifest(source, 'rb') as file:
+        # Open elements from the root down; finished elements are detached from
+        # their parent so memory stays flat however large the POM is
+        stack = []
+        fields = {}
+        for event, element in ET.iterparse(file, events=('start', 'end')):
+            if event == 'start':
+                stack.append(element)
+                continue
+
+            stack.pop()
+            tag = local_name(element.tag)
+            if stack and local_name(stack[-1].tag) == 'dependency' and tag in ('groupId', 'artifactId', 'version'):
+                fields[tag] = (element.text or '').strip()
+            elif tag == 'dependency':
+                if 'groupId' in fields and 'artifactId' in fields:
+                    yield Dependency('maven', f"{fields['groupId']}:{fields['artifactId']}", fields.get('version'))
+                fields = {}
+
+            element.clear()
+            if stack:
+                stack[-1].remove(element)
+
+
+@metrics.instrumented('parse', 'requirements')
+def parse_requirements(source):
+    "Yield Dependency records from a pip requirements file"
+    with open_manifest(source) as file:
+        for line in file:
+            line = line.strip()
+            # Skip comments and pip options such as -r or --index-url
+            if line and not line.startswith("#") and not line.startswith("-"):
+                dependency = line.split('==')
+                match = REQUIREMENT_NAME.match(dependency[0])
+                if match:
+                    yield Dependency('pypi', match.group(0),
+                                     dependency[1].strip() if len(dependency) > 1 else None)
+
+
+@metrics.instrumented('parse', 'gemfile')
+def parse_gemfile(source):
+    "Yield Dependency records for the gems in a Gemfile that pin a version"
+    with open_manifest(source) as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("gem"):
+                match = GEM_LINE.match(line)
+                if not match:
+                    print(f"Warning: Malformed line in Gemfile - {line}")
+                elif match.group(2) is None:
+                    print(f"Warning: No version specified for {match.group(1)}.")
+                else:
+                    yield Dependency('rubygems', match.group(1), match.group(2))
+
+
+@metrics.instrumented('parse', 'build_gradle')
+def parse_build_gradle(source):
+    "Yield Dependency records from implementation lines of a build.gradle"
+    with open_manifest(source) as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith("implementation"):
+                parts = line.split("'")
+                if len(parts) >= 6:
+                    yield Dependency('maven', f"{parts[1]}:{parts[3]}", parts[5])
+                elif len(parts) >= 4:
+                    print(f"Warning: No version specified for {parts[1]}:{parts[3]}.")
+
+
+@metrics.instrumented('parse', 'yaml')
+def parse_yaml(source):
+    "Yield Dependency records from the dependencies list of a YAML file"
+    # PyYAML is slow to import and only needed here
+    import yaml
+
+    with open_manifest(source) as file:
+        data = yaml.safe_load(file)
+
+    for dependency in data.get('dependencies', []):
+        if 'name' in dependency:
+            name = dependency['name']
+            if 'version' in dependency:
+                yield Dependency('rubygems', name, str(dependency['version']))
+            else:
+                print(f"Warning: No version specified for {name} in the YAML file.")
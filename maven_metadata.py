@@ -0,0 +1,98 @@
+import io
+import os
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+
+import registry_cache
+import version_ordering
+
+# Repository that maven-metadata.xml is read from; may be an internal Nexus/Artifactory
+# mirror or a file:// directory laid out like a Maven repository
+repository_url = os.environ.get('DEPENDENCY_ANALYSER_MAVEN_REPOSITORY', 'https://repo1.maven.org/maven2')
+
+
+def metadata_url(group_id, artifact_id, repository=None):
+    "Build the maven-metadata.xml location for a group:artifact"
+    base = (repository or repository_url).rstrip('/')
+    return f"{base}/{group_id.replace('.', '/')}/{artifact_id}/maven-metadata.xml"
+
+
+def pom_url(group_id, artifact_id, version, repository=None):
+    "Build the location of an artifact's POM"
+    base = (repository or repository_url).rstrip('/')
+    return f"{base}/{group_id.replace('.', '/')}/{artifact_id}/{version}/{artifact_id}-{version}.pom"
+
+
+def local_path(url):
+    "Filesystem path of a file:// URL"
+    # urllib.request is slow to import and only needed for this
+    from urllib.request import url2pathname
+    return url2pathname(urlsplit(url).path)
+
+
+def read_repository_file(url):
+    "Return the text of a repository file over http(s) (through the response cache) or file://, or None"
+    if url.startswith('file:'):
+        path = local_path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as file:
+            return file.read()
+    return registry_cache.get_text('maven', url, url)
+
+
+def read_pom(group_id, artifact_id, version, repository=None):
+    "Return the POM of group_id:artifact_id:version as text, or None when missing"
+    return read_repository_file(pom_url(group_id, artifact_id, version, repository))
+
+
+def parse_metadata(source):
+    "Stream-parse maven-metadata.xml from a file object, returning (release, versions)"
+    release = None
+    versions = []
+    for _, element in ET.iterparse(source, events=('end',)):
+        # Metadata published by some tools is namespaced, so compare local names
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag == 'release':
+            release = (element.text or '').strip() or None
+        elif tag == 'version' and element.text:
+            versions.append(element.text.strip())
+        if tag != 'metadata':
+            element.clear()
+    return release, versions
+
+
+def pick_stable_version(release, versions):
+    "Return the newest stable version among <release> and <versions>, skipping pre-releases"
+    candidates = list(versions)
+    if release:
+        candidates.append(release)
+    return version_ordering.latest_stable('maven', candidates)
+
+
+def read_metadata(group_id, artifact_id, repository=None):
+    "Fetch and parse maven-metadata.xml, returning (release, versions) or None when missing"
+    url = metadata_url(group_id, artifact_id, repository)
+    if url.startswith('file:'):
+        path = local_path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as file:
+            return parse_metadata(file)
+
+    body = registry_cache.get_text('maven', url, url)
+    if body is None:
+        return None
+    return parse_metadata(io.BytesIO(body.encode('utf-8')))
+
+
+def get_latest_version(group_id, artifact_id, repository=None):
+    "Return the newest stable version of group_id:artifact_id, or None"
+    try:
+        metadata = read_metadata(group_id, artifact_id, repository)
+    except ET.ParseError as error:
+        print(f"Warning: Malformed maven-metadata.xml for {group_id}:{artifact_id} - {error}")
+        return None
+    if metadata is None:
+        return None
+    return pick_stable_version(*metadata)
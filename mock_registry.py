@@ -0,0 +1,272 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Number of releases every synthetic package has
+DEFAULT_VERSION_COUNT = 20
+
+MAVEN_METADATA = re.compile(r'^/maven2/(.+)/([^/]+)/maven-metadata\.xml$')
+MAVEN_POM = re.compile(r'^/maven2/(.+)/([^/]+)/([^/]+)/[^/]+\.pom$')
+PYPI_PROJECT = re.compile(r'^/pypi/([^/]+)(?:/([^/]+))?/json$')
+PYPI_SIMPLE = re.compile(r'^/simple/([^/]+)/$')
+RUBYGEMS_VERSIONS = re.compile(r'^/api/v1/versions/([^/]+)\.json$')
+RUBYGEMS_LATEST = re.compile(r'^/api/v1/versions/([^/]+)/latest\.json$')
+RUBYGEMS_INFO = re.compile(r'^/info/([^/]+)$')
+
+
+def package_versions(name, count=DEFAULT_VERSION_COUNT):
+    "Deterministic release history of a synthetic package, oldest first, ending in a pre-release"
+    seed = int.from_bytes(hashlib.md5(name.encode('utf-8')).digest()[:4], 'big')
+    major = seed % 5 + 1
+    versions = [f"{major + i // 10}.{i % 10}.{seed % 7}" for i in range(count)]
+    versions.append(f"{major + count // 10}.{count % 10}.0rc1")
+    return versions
+
+
+class MockRegistry:
+    "Settings and counters shared by the request handlers"
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, missing_rate=0.0,
+                 version_count=DEFAULT_VERSION_COUNT, seed=None):
+        "latency and jitter are in seconds; rate_limit is requests per second before answering 429"
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.missing_rate = missing_rate
+        self.version_count = version_count
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def admit(self):
+        "Return (status, delay) for the next request: 200, 429 (rate limited) or 500 (injected error)"
+        with self.lock:
+            self.requests += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self.window_start >= 1.0:
+                    self.window_start = now
+                    self.window_count = 0
+                self.window_count += 1
+                if self.window_count > self.rate_limit:
+                    self.throttled += 1
+                    return 429, 0.0
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.errors += 1
+                return 500, delay
+            return 200, delay
+
+    def is_missing(self, name):
+        # Stable per name, so retries and repeated runs agree
+        if not self.missing_rate:
+            return False
+        return int.from_bytes(hashlib.md5(name.encode('utf-8')).digest()[4:8], 'big') / 2 ** 32 < self.missing_rate
+
+    def versions(self, name):
+        return package_versions(name, self.version_count)
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'throttled': self.throttled,
+                    'bytes_sent': self.bytes_sent}
+
+    def reset(self):
+        with self.lock:
+            self.requests = self.errors = self.throttled = self.bytes_sent = 0
+
+
+class MockRegistryHandler(BaseHTTPRequestHandler):
+    "Serves the PyPI JSON and simple, RubyGems versions and compact index, Maven repository and search endpoints"
+    protocol_version = 'HTTP/1.1'
+    # Buffered writes so small responses leave in one segment, and no Nagle delay for large ones
+    # (otherwise keep-alive connections stall on the client's delayed ACK)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        registry = self.server.registry
+        status, delay = registry.admit()
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            return self.send_body(429, b'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+        if status == 500:
+            return self.send_body(500, b'Injected error', 'text/plain')
+
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        match = PYPI_PROJECT.match(path)
+        if match:
+            return self.send_pypi(match.group(1), match.group(2))
+        match = PYPI_SIMPLE.match(path)
+        if match:
+            return self.send_pypi_simple(match.group(1))
+        match = RUBYGEMS_VERSIONS.match(path)
+        if match:
+            return self.send_rubygems(match.group(1))
+        match = RUBYGEMS_LATEST.match(path)
+        if match:
+            return self.send_rubygems_latest(match.group(1))
+        match = RUBYGEMS_INFO.match(path)
+        if match:
+            return self.send_rubygems_info(match.group(1))
+        match = MAVEN_METADATA.match(path)
+        if match:
+            return self.send_maven_metadata(match.group(1).replace('/', '.'), match.group(2))
+        match = MAVEN_POM.match(path)
+        if match:
+            return self.send_maven_pom(match.group(1).replace('/', '.'), match.group(2), match.group(3))
+        if path == '/solrsearch/select':
+            return self.send_maven_search(parse_qs(url.query).get('q', [''])[0])
+        self.send_body(404, b'Not Found', 'text/plain')
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.registry.lock:
+            self.server.registry.bytes_sent += len(body)
+
+    def send_json(self, data):
+        self.send_body(200, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def send_pypi(self, name, version):
+        registry = self.server.registry
+        if registry.is_missing(name):
+            return self.send_body(404, b'Not Found', 'text/plain')
+        versions = registry.versions(name)
+        stable = [v for v in versions if 'rc' not in v]
+        # Shaped like the real document: a long description, and every file of every release
+        files = {v: [{'filename': f"{name}-{v}{suffix}", 'url': f"/files/{name}-{v}{suffix}",
+                      'digests': {'sha256': hashlib.sha256(f"{name}{v}{suffix}".encode('utf-8')).hexdigest()},
+                      'packagetype': 'sdist' if suffix == '.tar.gz' else 'bdist_wheel', 'python_version': 'py3',
+                      'requires_python': '>=3.8', 'size': 100000, 'upload_time': '2024-01-01T00:00:00',
+                      'yanked': False, 'yanked_reason': None}
+                     for suffix in ('.tar.gz', '-py3-none-any.whl')] for v in versions}
+        self.send_json({
+            'info': {'name': name, 'version': version or stable[-1], 'requires_dist': None,
+                     'description': f"# {name}\n\n" + 'Synthetic package used for benchmarking. ' * 200},
+            'releases': {} if version else files,
+            'urls': files[version or stable[-1]] if (version or stable[-1]) in files else [],
+        })
+
+    def send_pypi_simple(self, name):
+        registry = self.server.registry
+        if registry.is_missing(name):
+            return self.send_body(404, b'Not Found', 'text/plain')
+        versions = registry.versions(name)
+        files = [{'filename': f"{name}-{v}{suffix}", 'url': f"/files/{name}-{v}{suffix}",
+                  'hashes': {'sha256': hashlib.sha256(f"{name}{v}{suffix}".encode('utf-8')).hexdigest()},
+                  'requires-python': '>=3.8', 'yanked': False}
+                 for v in versions for suffix in ('.tar.gz', '-py3-none-any.whl')]
+        body = json.dumps({'files': files, 'meta': {'api-version': '1.1'}, 'name': name, 'versions': versions})
+        self.send_body(200, body.encode('utf-8'), 'application/vnd.pypi.simple.v1+json')
+
+    def send_rubygems_latest(self, name):
+        registry = self.server.registry
+        if registry.is_missing(name):
+            return self.send_json({'version': 'unknown'})
+        self.send_json({'version': [v for v in registry.versions(name) if 'rc' not in v][-1]})
+
+    def send_rubygems_info(self, name):
+        registry = self.server.registry
+        if registry.is_missing(name):
+            return self.send_body(404, b'Not Found', 'text/plain')
+        lines = ['---'] + [f"{v.replace('rc', '.rc')} |checksum:{hashlib.sha256(v.encode('utf-8')).hexdigest()}"
+                           for v in registry.versions(name)]
+        self.send_body(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'text/plain')
+
+    def send_rubygems(self, name):
+        registry = self.server.registry
+        if registry.is_missing(name):
+            return self.send_body(404, b'Not Found', 'text/plain')
+        self.send_json([{'number': v.replace('rc', '.rc'), 'prerelease': 'rc' in v}
+                        for v in reversed(registry.versions(name))])
+
+    def send_maven_metadata(self, group_id, artifact_id):
+        registry = self.server.registry
+        if registry.is_missing(f"{group_id}:{artifact_id}"):
+            return self.send_body(404, b'Not Found', 'text/plain')
+        versions = [v.replace('rc', '-RC') for v in registry.versions(f"{group_id}:{artifact_id}")]
+        body = (f"<metadata><groupId>{group_id}</groupId><artifactId>{artifact_id}</artifactId><versioning>"
+                f"<latest>{versions[-1]}</latest><release>{versions[-2]}</release><versions>"
+                + ''.join(f"<version>{v}</version>" for v in versions)
+                + "</versions></versioning></metadata>")
+        self.send_body(200, body.encode('utf-8'), 'application/xml')
+
+    def send_maven_pom(self, group_id, artifact_id, version):
+        body = (f'<project xmlns="http://maven.apache.org/POM/4.0.0"><groupId>{group_id}</groupId>'
+                f'<artifactId>{artifact_id}</artifactId><version>{version}</version></project>')
+        self.send_body(200, body.encode('utf-8'), 'application/xml')
+
+    def send_maven_search(self, query):
+        match = re.match(r'g:"([^"]+)" AND a:"([^"]+)"', query)
+        if not match:
+            return self.send_json({'response': {'numFound': 0, 'docs': []}})
+        name = f"{match.group(1)}:{match.group(2)}"
+        versions = [v for v in self.server.registry.versions(name) if 'rc' not in v]
+        self.send_json({'response': {'numFound': len(versions),
+                                     'docs': [{'g': match.group(1), 'a': match.group(2), 'v': v}
+                                              for v in reversed(versions)]}})
+
+
+def start_server(registry, host='127.0.0.1', port=0):
+    "Serve registry on a background thread; returns the server (its base URL is server.url)"
+    server = ThreadingHTTPServer((host, port), MockRegistryHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def environment(url):
+    "Environment variables pointing main.py and app.py at a mock registry served from url"
+    return {
+        'DEPENDENCY_ANALYSER_PYPI_URL': url,
+        'DEPENDENCY_ANALYSER_RUBYGEMS_URL': url,
+        'DEPENDENCY_ANALYSER_MAVEN_SEARCH_URL': url,
+        'DEPENDENCY_ANALYSER_MAVEN_REPOSITORY': f"{url}/maven2",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the PyPI, RubyGems and Maven registries")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="delay added to every response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="random +/- variation of the delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--rate-limit', type=float, help="requests per second before answering 429")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="fraction of packages that do not exist")
+    args = parser.parse_args()
+
+    server = start_server(MockRegistry(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate,
+                                       args.rate_limit, args.missing_rate), args.host, args.port)
+    for name, value in environment(server.url).items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,179 @@
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+
+import maven_metadata
+from resolution_planner import normalize_name
+from version_ordering import latest_stable
+
+# Snapshot layout: header, (count + 1) record offsets, then the records sorted by key.
+# Each record is b"<ecosystem>\0<normalized name>\t<latest stable version>".
+MAGIC = b'DAIDX001'
+HEADER = struct.Struct('<8sQ')
+OFFSET = struct.Struct('<Q')
+
+
+def index_key(ecosystem, name):
+    return f"{ecosystem}\0{normalize_name(ecosystem, name)}".encode('utf-8')
+
+
+class OfflineIndex:
+    "Memory-mapped, read-only lookup of latest stable versions built by write_index"
+
+    def __init__(self, path):
+        "Map the snapshot file into memory"
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a dependency index snapshot")
+        self.records_start = HEADER.size + OFFSET.size * (self.count + 1)
+        # Offsets are little-endian uint64, which matches memoryview 'Q' on the platforms we run on
+        self.offsets = memoryview(self.data)[HEADER.size:self.records_start].cast('Q')
+
+    def __len__(self):
+        return self.count
+
+    def record(self, position):
+        start = self.records_start + self.offsets[position]
+        end = self.records_start + self.offsets[position + 1]
+        key, _, version = self.data[start:end].partition(b'\t')
+        return key, version
+
+    def lookup(self, ecosystem, name):
+        "Binary search the snapshot; returns the latest stable version or None"
+        key = index_key(ecosystem, name)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, version = self.record(middle)
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return version.decode('utf-8')
+        return None
+
+    def items(self):
+        "Yield every (key, version) pair in key order"
+        for position in range(self.count):
+            key, version = self.record(position)
+            yield key, version.decode('utf-8')
+
+    def close(self):
+        self.offsets.release()
+        self.data.close()
+        self.file.close()
+
+
+def write_index(entries, path):
+    "Write a dict of index_key -> version to path, replacing any previous snapshot atomically"
+    keys = sorted(entries)
+    records = [key + b'\t' + entries[key].encode('utf-8') for key in keys]
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(records)))
+        offset = 0
+        file.write(OFFSET.pack(offset))
+        for record in records:
+            offset += len(record)
+            file.write(OFFSET.pack(offset))
+        for record in records:
+            file.write(record)
+    os.replace(temp_path, path)
+
+
+def load_pypi_simple(directory):
+    "Yield (ecosystem, name, version) from a directory of PyPI JSON project pages"
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if 'info' in data:
+            # /pypi/<name>/json document
+            yield 'pypi', data['info']['name'], data['info']['version']
+        else:
+            # PEP 691 simple API project page with the PEP 700 "versions" list
+            version = latest_stable('pypi', data.get('versions', []))
+            if version:
+                yield 'pypi', data['name'], version
+
+
+def load_rubygems_versions(path):
+    "Yield (ecosystem, name, version) from a RubyGems compact index `versions` file"
+    gems = {}
+    with open(path, 'r', encoding='utf-8') as file:
+        # Skip the created_at preamble up to the --- separator
+        for line in file:
+            if line.strip() == '---':
+                break
+        for line in file:
+            parts = line.split(' ')
+            if len(parts) < 2:
+                continue
+            versions = gems.setdefault(parts[0], set())
+            for version in parts[1].split(','):
+                if version.startswith('-'):
+                    # Yanked release
+                    versions.discard(version[1:].split('-', 1)[0])
+                else:
+                    # Drop platform suffixes such as 1.13.10-x86_64-linux
+                    versions.add(version.split('-', 1)[0])
+    for gem_name, versions in gems.items():
+        version = latest_stable('rubygems', versions)
+        if version:
+            yield 'rubygems', gem_name, version
+
+
+def load_maven_metadata(directory):
+    "Yield (ecosystem, name, version) from maven-metadata.xml files under a repository directory"
+    for path in glob.glob(os.path.join(directory, '**', 'maven-metadata.xml'), recursive=True):
+        relative = os.path.relpath(os.path.dirname(path), directory).split(os.sep)
+        if len(relative) < 2:
+            continue
+        group_id, artifact_id = '.'.join(relative[:-1]), relative[-1]
+        with open(path, 'rb') as file:
+            version = maven_metadata.pick_stable_version(*maven_metadata.parse_metadata(file))
+        if version:
+            yield 'maven', f"{group_id}:{artifact_id}", version
+
+
+def build_index(output, pypi=None, rubygems=None, maven=None, update=False):
+    "Build (or refresh, when update is set) the snapshot at output from the given sources"
+    entries = {}
+    if update and os.path.exists(output):
+        index = OfflineIndex(output)
+        entries.update(index.items())
+        index.close()
+
+    sources = []
+    if pypi:
+        sources.append(load_pypi_simple(pypi))
+    if rubygems:
+        sources.append(load_rubygems_versions(rubygems))
+    if maven:
+        sources.append(load_maven_metadata(maven))
+    for source in sources:
+        for ecosystem, name, version in source:
+            entries[index_key(ecosystem, name)] = version
+
+    write_index(entries, output)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the offline registry index snapshot")
+    parser.add_argument('output', help="snapshot file to write")
+    parser.add_argument('--pypi', help="directory of PyPI JSON project pages")
+    parser.add_argument('--rubygems', help="RubyGems compact index `versions` file")
+    parser.add_argument('--maven', help="directory laid out like a Maven repository")
+    parser.add_argument('--update', action='store_true', help="keep entries from the existing snapshot")
+    args = parser.parse_args()
+
+    count = build_index(args.output, args.pypi, args.rubygems, args.maven, args.update)
+    print(f"Wrote {count} entries to {args.output}")
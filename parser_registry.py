@@ -0,0 +1,96 @@
+import fnmatch
+import importlib
+import os
+import threading
+
+# Manifest type -> (file name patterns, "module:function"); a parser's module is only
+# imported the first time a manifest of its type is parsed
+BUILTIN_PARSERS = {
+    'pom': (('pom.xml',), 'manifest_parsers:parse_pom'),
+    'requirements': (('requirements.txt',), 'manifest_parsers:parse_requirements'),
+    'gemfile': (('Gemfile',), 'manifest_parsers:parse_gemfile'),
+    'build_gradle': (('build.gradle',), 'manifest_parsers:parse_build_gradle'),
+    # Lockfiles list every resolved package, transitive ones included (see lockfile_parsers.py)
+    'gemfile_lock': (('Gemfile.lock', 'gems.locked'), 'lockfile_parsers:parse_gemfile_lock'),
+    'poetry_lock': (('poetry.lock',), 'lockfile_parsers:parse_poetry_lock'),
+    'pipfile_lock': (('Pipfile.lock',), 'lockfile_parsers:parse_pipfile_lock'),
+    'gradle_lockfile': (('gradle.lockfile', 'buildscript-gradle.lockfile'), 'lockfile_parsers:parse_gradle_lockfile'),
+    # Saved output of `mvn dependency:list -DoutputFile=dependency-list.txt` (or the console log)
+    'maven_dependency_list': (('dependency-list.txt',), 'lockfile_parsers:parse_maven_dependency_list'),
+    # Not detected by name: travis-style YAML files are only parsed when asked for
+    'yaml': ((), 'manifest_parsers:parse_yaml'),
+}
+
+# Installed packages can add parsers through entry points in this group. The entry point
+# name is the manifest type and its value the parser; file name patterns come from the
+# parser's optional manifest_patterns attribute
+ENTRY_POINT_GROUP = 'dependency_analyser.parsers'
+
+registry = {kind: (patterns, target) for kind, (patterns, target) in BUILTIN_PARSERS.items()}
+loaded = {}
+plugins_loaded = False
+lock = threading.Lock()
+
+
+def register(kind, patterns, target):
+    "Add or replace a parser; target is a callable or a lazily imported 'module:function' string"
+    with lock:
+        registry[kind] = (tuple(patterns), target)
+        loaded.pop(kind, None)
+
+
+def load_plugins():
+    "Register parsers published through ENTRY_POINT_GROUP (importlib.metadata is only loaded here)"
+    global plugins_loaded
+    if plugins_loaded:
+        return
+    from importlib.metadata import entry_points
+    published = entry_points()
+    if hasattr(published, 'select'):
+        published = published.select(group=ENTRY_POINT_GROUP)
+    else:
+        # Python 3.8 and 3.9 return a plain dict of group -> entry points
+        published = published.get(ENTRY_POINT_GROUP, [])
+    for entry_point in published:
+        if entry_point.name not in registry:
+            parser = entry_point.load()
+            register(entry_point.name, getattr(parser, 'manifest_patterns', ()), parser)
+    plugins_loaded = True
+
+
+def match(name):
+    for kind, (patterns, _) in registry.items():
+        if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns):
+            return kind
+    return None
+
+
+def detect(path):
+    "Manifest type of a file, by name, or None if no parser handles it"
+    name = os.path.basename(path)
+    kind = match(name)
+    if kind is None and not plugins_loaded:
+        load_plugins()
+        kind = match(name)
+    return kind
+
+
+def parser_for(kind):
+    "The parse function for a manifest type, importing its module on first use"
+    parser = loaded.get(kind)
+    if parser is not None:
+        return parser
+    if kind not in registry and not plugins_loaded:
+        load_plugins()
+    _, target = registry[kind]
+    if isinstance(target, str):
+        module_name, function_name = target.split(':', 1)
+        target = getattr(importlib.import_module(module_name), function_name)
+    with lock:
+        loaded[kind] = target
+    return target
+
+
+def parse(kind, source):
+    "Parse a manifest (path or file object) of the given type"
+    return parser_for(kind)(source)
@@ -0,0 +1,72 @@
+import json
+import re
+
+import registry_cache
+import registry_client
+from resolution_planner import normalize_name
+from version_ordering import latest_stable
+
+# PEP 691 JSON form of the simple index; api-version 1.1 (PEP 700) adds the versions list
+ACCEPT = 'application/vnd.pypi.simple.v1+json'
+
+# The top-level "versions" key; a JSON string value can hold an unescaped '"' only at its
+# ends, so this byte sequence cannot occur inside the file names that precede it
+VERSIONS_KEY = re.compile(rb'"versions"\s*:\s*\[')
+
+# Cached in place of the versions when a project's simple page has no versions list (an HTML-only
+# mirror or proxy, or api-version 1.0); that project uses the JSON API until the entry expires
+UNSUPPORTED = '\0unsupported'
+
+
+def project_url(name):
+    return f"{registry_client.PYPI_URL}/simple/{normalize_name('pypi', name)}/"
+
+
+def read_versions(chunks):
+    "Return the versions array of a streamed PEP 691 document without decoding the files array, or None"
+    tail = b''
+    found = None
+    for chunk in chunks:
+        if found is None:
+            buffer = tail + chunk
+            match = VERSIONS_KEY.search(buffer)
+            if match is None:
+                # Keep enough bytes to catch the key split across two chunks
+                tail = buffer[-64:]
+                continue
+            found = bytearray(buffer[match.end() - 1:])
+        else:
+            found += chunk
+        # Version strings never contain ']', so the first one closes the array
+        end = found.find(b']')
+        if end != -1:
+            return json.loads(bytes(found[:end + 1]))
+    return None
+
+
+def extract_versions(response):
+    "Cache body for a simple index response: its versions array as JSON, or UNSUPPORTED"
+    if 'json' not in response.headers.get('Content-Type', ''):
+        return UNSUPPORTED
+    versions = read_versions(registry_client.iter_content(response))
+    if versions is None:
+        # api-version 1.0 has no versions list
+        return UNSUPPORTED
+    return json.dumps(versions)
+
+
+def get_versions(name):
+    "Return every version of a PyPI project listed by the simple index, None if not found, or UNSUPPORTED"
+    body = registry_cache.get_extracted('pypi', f"simple-versions:{normalize_name('pypi', name)}", project_url(name),
+                                        extract_versions, headers={'Accept': ACCEPT}, stream=True)
+    if body is None or body == UNSUPPORTED:
+        return body
+    return json.loads(body)
+
+
+def get_latest_version(name):
+    "Return the newest stable version of a PyPI project from the simple index, None, or UNSUPPORTED"
+    versions = get_versions(name)
+    if versions is None or versions == UNSUPPORTED:
+        return versions
+    return latest_stable('pypi', versions)
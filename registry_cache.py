@@ -0,0 +1,256 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import registry_client
+from scan_metrics import metrics
+
+# Location of the cache database shared by main.py and app.py
+DEFAULT_CACHE_PATH = os.environ.get(
+    'DEPENDENCY_ANALYSER_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'dependency_analyser', 'registry.sqlite3')
+)
+
+# How long (in seconds) a cached response is served without asking the registry again
+DEFAULT_TTLS = {
+    'maven': 24 * 60 * 60,
+    'pypi': 6 * 60 * 60,
+    'rubygems': 6 * 60 * 60,
+}
+
+# Upper bound on the total size of cached response bodies
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Eviction frees space down to this share of max_bytes, so it does not run again on the next store
+EVICT_TO = 0.9
+
+# Cache hits whose access time is written to the database in one batch
+ACCESS_BATCH_SIZE = 500
+
+
+class RegistryCache:
+    "Persistent registry response cache with per-ecosystem TTLs and LRU eviction"
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttls=None, max_bytes=DEFAULT_MAX_BYTES):
+        "Open (or create) the SQLite database backing the cache"
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only syncs at checkpoints; a crash can lose recent entries, never corrupt the cache
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' ecosystem TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' body TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' fetched_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' PRIMARY KEY (ecosystem, key))'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+        # Running total of body sizes, so a store does not have to sum the whole table
+        self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        # Access times of cache hits not yet written: {(ecosystem, key): accessed_at}
+        self.accessed = {}
+        atexit.register(self.flush_accesses)
+
+    def lookup(self, ecosystem, key):
+        "Return the cached row for a coordinate as a dict, or None"
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT body, etag, last_modified, fetched_at FROM responses WHERE ecosystem = ? AND key = ?',
+                (ecosystem, key)
+            ).fetchone()
+            if row is None:
+                return None
+            # Only LRU eviction reads accessed_at, so hits are recorded in batches
+            self.accessed[(ecosystem, key)] = time.time()
+            if len(self.accessed) >= ACCESS_BATCH_SIZE:
+                self.write_accesses()
+        return {'body': row[0], 'etag': row[1], 'last_modified': row[2], 'fetched_at': row[3]}
+
+    def store(self, ecosystem, key, body, etag=None, last_modified=None):
+        "Insert or replace a response body and evict least recently used rows past max_bytes"
+        now = time.time()
+        with self.lock:
+            previous = self.connection.execute(
+                'SELECT size FROM responses WHERE ecosystem = ? AND key = ?', (ecosystem, key)
+            ).fetchone()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (ecosystem, key, body, etag, last_modified, now, now, len(body))
+            )
+            self.accessed.pop((ecosystem, key), None)
+            self.total_bytes += len(body) - (previous[0] if previous else 0)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def touch(self, ecosystem, key):
+        "Mark a cached response as freshly revalidated"
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE ecosystem = ? AND key = ?',
+                (now, now, ecosystem, key)
+            )
+
+    def write_accesses(self):
+        # Caller must hold self.lock
+        if self.accessed:
+            self.connection.executemany(
+                'UPDATE responses SET accessed_at = ? WHERE ecosystem = ? AND key = ?',
+                [(accessed_at, ecosystem, key) for (ecosystem, key), accessed_at in self.accessed.items()]
+            )
+            self.accessed = {}
+
+    def flush_accesses(self):
+        "Write pending cache-hit access times (also done at exit)"
+        with self.lock:
+            self.write_accesses()
+
+    def evict(self):
+        # Caller must hold self.lock. The running total is re-read here, since other processes
+        # (main.py and app.py share the file) may have added or evicted entries
+        self.write_accesses()
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        target = self.max_bytes * EVICT_TO
+        if total > self.max_bytes:
+            cursor = self.connection.execute('SELECT ecosystem, key, size FROM responses ORDER BY accessed_at')
+            victims = []
+            for ecosystem, key, size in cursor:
+                if total <= target:
+                    break
+                victims.append((ecosystem, key))
+                total -= size
+            cursor.close()
+            self.connection.execute('BEGIN')
+            self.connection.executemany('DELETE FROM responses WHERE ecosystem = ? AND key = ?', victims)
+            self.connection.execute('COMMIT')
+        self.total_bytes = total
+
+    def is_fresh(self, ecosystem, entry):
+        return time.time() - entry['fetched_at'] < self.ttls.get(ecosystem, 0)
+
+    def get_text(self, ecosystem, key, url):
+        "Return the body of url, serving from the cache while fresh and revalidating once stale"
+        return self.get_extracted(ecosystem, key, url, read_text)
+
+    def get_extracted(self, ecosystem, key, url, extract, headers=None, stream=False):
+        "Like get_text, but caches extract(response) (text, or None for nothing usable) instead of the body"
+        # Already loaded by registry_client whenever a request can fail; imported here to keep startup lean
+        import requests
+
+        entry = self.lookup(ecosystem, key)
+        if entry is not None and self.is_fresh(ecosystem, entry):
+            metrics.increment('cache', f"{ecosystem}:hit")
+            return entry['body']
+
+        headers = dict(headers or {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = registry_client.get(url, headers=headers, stream=stream)
+        except requests.RequestException as error:
+            # Serve the stale copy rather than failing the whole scan
+            print(f"Warning: {url} failed - {error}")
+            metrics.increment('cache', f"{ecosystem}:{'stale' if entry is not None else 'miss'}")
+            return entry['body'] if entry is not None else None
+        with response:
+            if response.status_code == 304 and entry is not None:
+                metrics.increment('cache', f"{ecosystem}:revalidated")
+                self.touch(ecosystem, key)
+                return entry['body']
+            if response.status_code in registry_client.RETRY_STATUSES and entry is not None:
+                # Retries ran out on a throttled or failing registry: the stale copy beats "Not found"
+                print(f"Warning: {url} failed - HTTP {response.status_code}, serving the cached copy")
+                metrics.increment('cache', f"{ecosystem}:stale")
+                return entry['body']
+            metrics.increment('cache', f"{ecosystem}:miss")
+            if response.status_code != 200:
+                return None
+            try:
+                body = extract(response)
+            except (requests.RequestException, ValueError) as error:
+                print(f"Warning: {url} could not be read - {error}")
+                return entry['body'] if entry is not None else None
+        if body is None:
+            return None
+
+        self.store(ecosystem, key, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return body
+
+    def get_json(self, ecosystem, key, url):
+        "Return the decoded JSON for url, see get_text"
+        body = self.get_text(ecosystem, key, url)
+        return json.loads(body) if body is not None else None
+
+
+def read_text(response):
+    return response.text
+
+
+# Set to False (e.g. by --no-cache) to always go to the registry
+cache_enabled = True
+
+default_cache = None
+default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    "Return the process-wide cache, opening it on first use"
+    global default_cache
+    with default_cache_lock:
+        if default_cache is None:
+            default_cache = RegistryCache()
+        return default_cache
+
+
+def get_text(ecosystem, key, url):
+    "Fetch a registry document through the shared cache; returns None on a non-200 response"
+    if cache_enabled:
+        return get_default_cache().get_text(ecosystem, key, url)
+    import requests
+    try:
+        response = registry_client.get(url)
+    except requests.RequestException as error:
+        print(f"Warning: {url} failed - {error}")
+        return None
+    if response.status_code != 200:
+        return None
+    return response.text
+
+
+def get_extracted(ecosystem, key, url, extract, headers=None, stream=False):
+    "Fetch url through the shared cache, keeping only extract(response); returns None when unusable"
+    if cache_enabled:
+        return get_default_cache().get_extracted(ecosystem, key, url, extract, headers, stream)
+    import requests
+    try:
+        with registry_client.get(url, headers=headers, stream=stream) as response:
+            if response.status_code != 200:
+                return None
+            return extract(response)
+    except (requests.RequestException, ValueError) as error:
+        print(f"Warning: {url} failed - {error}")
+        return None
+
+
+def get_json(ecosystem, key, url):
+    "Fetch registry JSON through the shared cache; returns None on a non-200 response"
+    body = get_text(ecosystem, key, url)
+    return json.loads(body) if body is not None else None
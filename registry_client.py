@@ -0,0 +1,159 @@
+import email.utils
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from scan_metrics import metrics
+
+# Registry base URLs; point them at a mirror (or the benchmark's mock registry) through the environment
+PYPI_URL = os.environ.get('DEPENDENCY_ANALYSER_PYPI_URL', 'https://pypi.org').rstrip('/')
+RUBYGEMS_URL = os.environ.get('DEPENDENCY_ANALYSER_RUBYGEMS_URL', 'https://rubygems.org').rstrip('/')
+MAVEN_SEARCH_URL = os.environ.get('DEPENDENCY_ANALYSER_MAVEN_SEARCH_URL', 'https://search.maven.org').rstrip('/')
+
+# (connect, read) timeout in seconds for every registry request
+DEFAULT_TIMEOUT = (5, 30)
+
+# Retries after the first attempt for connection errors, timeouts and RETRY_STATUSES
+DEFAULT_MAX_RETRIES = 4
+
+# Base delay in seconds for exponential backoff: factor * 2 ** attempt
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+# Longest we are willing to wait on a single Retry-After header
+MAX_RETRY_AFTER = 120
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Requests per second allowed to each host; hosts not listed are not throttled
+DEFAULT_RATE_LIMITS = {
+    'search.maven.org': 5.0,
+}
+
+# Keep-alive connections kept open per host
+POOL_SIZE = int(os.environ.get('DEPENDENCY_ANALYSER_WORKERS', '16'))
+
+
+def parse_retry_after(value):
+    "Convert a Retry-After header (seconds or HTTP date) to a delay in seconds, or None"
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+class HostRateLimiter:
+    "Spaces out requests to one host and holds them back while the host asks us to"
+
+    def __init__(self, rate=None):
+        "rate is the most requests per second to send, or None for no limit"
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        "Block until the next request to this host may be sent"
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def block_for(self, delay):
+        "Push every later request to this host back by at least delay seconds"
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + delay)
+
+
+class RegistryClient:
+    "Shared HTTP client for registry lookups with pooled connections, timeouts and retries"
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, rate_limits=None, pool_size=POOL_SIZE):
+        "Create the session and per-host connection pools"
+        # requests is only loaded once something is fetched, so offline runs start faster
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS, **(rate_limits or {}))
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+        # urllib3 keeps one pool of pool_size keep-alive connections per host
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def limiter_for(self, host):
+        with self.limiters_lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostRateLimiter(self.rate_limits.get(host))
+            return self.limiters[host]
+
+    def get(self, url, headers=None, stream=False):
+        "GET url, retrying connection errors, timeouts, 429 and 5xx with exponential backoff"
+        import requests
+
+        host = urlsplit(url).hostname
+        limiter = self.limiter_for(host)
+        attempt = 0
+        while True:
+            limiter.wait()
+            delay = self.backoff_factor * (2 ** attempt)
+            try:
+                with metrics.timed('http', host):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                metrics.increment('http_status', f"{host}:{response.status_code}")
+                if not stream:
+                    metrics.increment('http_bytes', host, len(response.content))
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    # Hold back every request to this host, not just this one
+                    limiter.block_for(retry_after)
+                    delay = max(delay, retry_after)
+                response.close()
+            attempt += 1
+            metrics.increment('http_retries', host)
+            time.sleep(delay)
+
+
+def iter_content(response, chunk_size=64 * 1024):
+    "Iterate over a streamed response body, counting the bytes received"
+    host = urlsplit(response.url).hostname
+    for chunk in response.iter_content(chunk_size):
+        metrics.increment('http_bytes', host, len(chunk))
+        yield chunk
+
+
+default_client = None
+default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    "Return the process-wide client, creating it on first use"
+    global default_client
+    with default_client_lock:
+        if default_client is None:
+            default_client = RegistryClient()
+        return default_client
+
+
+def get(url, headers=None, stream=False):
+    return get_default_client().get(url, headers=headers, stream=stream)
@@ -0,0 +1,87 @@
+from functools import partial
+
+import maven_metadata
+import pypi_simple
+import registry_cache
+import registry_client
+import rubygems_index
+from scan_metrics import metrics
+
+
+@metrics.instrumented('lookup', 'maven')
+def get_stable_version_maven(group_id, artifact_id):
+    # Read maven-metadata.xml from the configured repository (or the local response cache)
+    return maven_metadata.get_latest_version(group_id, artifact_id)
+
+
+@metrics.instrumented('lookup', 'maven')
+def get_stable_version_maven_search(group_id, artifact_id):
+    # Construct Maven Central URL
+    url = f"{registry_client.MAVEN_SEARCH_URL}/solrsearch/select?q=g:\"{group_id}\"+AND+a:\"{artifact_id}\"&core=gav&rows=20&wt=json"
+
+    # Fetch data from Maven Central (or the local response cache)
+    data = registry_cache.get_json('maven', f"{group_id}:{artifact_id}", url)
+
+    # Extract stable version from response
+    if data and data['response']['numFound'] > 0:
+        latest_version = data['response']['docs'][0]['v']
+        return latest_version
+    else:
+        return None
+
+
+@metrics.instrumented('lookup', 'pypi')
+def get_stable_version_pip(package_name):
+    # The simple index document is under half the size of the JSON API one, which adds descriptions and
+    # per-file digests and upload times; it still lists every file, as PEP 691 puts versions after files
+    stable_version = pypi_simple.get_latest_version(package_name)
+    if stable_version != pypi_simple.UNSUPPORTED:
+        return stable_version
+    return get_stable_version_pip_json(package_name)
+
+
+def get_stable_version_pip_json(package_name):
+    # Construct PyPI JSON API URL
+    url = f"{registry_client.PYPI_URL}/pypi/{package_name}/json"
+
+    # Fetch data from PyPI (or the local response cache)
+    data = registry_cache.get_json('pypi', package_name, url)
+
+    # Check if the package exists
+    if data:
+        # Extract stable version from the JSON response
+        return data["info"]["version"]
+    else:
+        return None
+
+
+@metrics.instrumented('lookup', 'rubygems')
+def get_stable_version_gem(gem_name):
+    # latest.json, or the compact index when that names a pre-release, instead of every version's metadata
+    return rubygems_index.get_latest_version(gem_name)
+
+
+# Gradle coordinates live on Maven Central too
+get_stable_version_gradle = get_stable_version_maven
+
+
+# Ecosystem -> function(name) giving the latest stable version; Maven names are group:artifact.
+# main.py and app.py share this dict, so the switches below apply to both
+LOOKUPS = {
+    'maven': lambda name: get_stable_version_maven(*name.split(':', 1)),
+    'pypi': get_stable_version_pip,
+    'rubygems': get_stable_version_gem,
+}
+
+
+def use_maven_search():
+    "Resolve Maven coordinates through the search.maven.org API instead of maven-metadata.xml"
+    LOOKUPS['maven'] = lambda name: get_stable_version_maven_search(*name.split(':', 1))
+
+
+def use_offline_index(path):
+    "Serve every lookup from a snapshot built by offline_index.py instead of the network"
+    from offline_index import OfflineIndex
+    index = OfflineIndex(path)
+    for ecosystem in LOOKUPS:
+        LOOKUPS[ecosystem] = partial(index.lookup, ecosystem)
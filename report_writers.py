@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+# Columns of the normalized report; Maven names are group:artifact, as in Dependency
+REPORT_FIELDS = ['repository', 'manifest', 'ecosystem', 'name', 'current_version', 'latest_version',
+                 'upgrade_type', 'recommendation', 'vulnerabilities', 'introduced_by']
+
+# Columns of the original dependency_versions.csv layout
+LEGACY_FIELDS = ['group_id', 'artifact_id', 'old_version', 'new_version', 'package_name', 'gem_name',
+                 'recommendation', 'upgrade_type', 'vulnerabilities', 'introduced_by']
+
+# Streaming text writers flush at least this often (seconds) so partial reports can be tailed
+FLUSH_INTERVAL = 1.0
+
+# Rows buffered before a SQLite insert or a Parquet row group is written
+BATCH_SIZE = 10000
+
+
+def report_record(dependency, row):
+    "Normalized report record for a Dependency and its resolved row"
+    return {
+        'repository': row.get('repository', ''),
+        'manifest': row.get('manifest', ''),
+        'ecosystem': dependency.ecosystem,
+        'name': dependency.name,
+        'current_version': dependency.version or '',
+        'latest_version': row['new_version'] if row['new_version'] != 'Not found' else '',
+        'upgrade_type': row.get('upgrade_type', ''),
+        'recommendation': row.get('recommendation', ''),
+        'vulnerabilities': row.get('vulnerabilities', ''),
+        'introduced_by': row.get('introduced_by', ''),
+    }
+
+
+class ReportWriter:
+    "Base class for report sinks; rows are written one at a time, in whatever order they resolve"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, dependency, row):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvReportWriter(ReportWriter):
+    "Normalized CSV, one row per dependency"
+    fields = REPORT_FIELDS
+
+    def __init__(self, path):
+        "Create (or truncate) the report file at path"
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction='ignore')
+        self.writer.writeheader()
+        self.flushed_at = time.monotonic()
+
+    def record(self, dependency, row):
+        return report_record(dependency, row)
+
+    def write(self, dependency, row):
+        self.writer.writerow(self.record(dependency, row))
+        if time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.flushed_at = time.monotonic()
+
+    def close(self):
+        self.file.close()
+
+
+class LegacyCsvReportWriter(CsvReportWriter):
+    "The original dependency_versions.csv layout, with a column per ecosystem's name fields"
+
+    def __init__(self, path, leading_fields=()):
+        "leading_fields are extra columns (e.g. repository) placed before the standard ones"
+        self.fields = [*leading_fields, *LEGACY_FIELDS]
+        super().__init__(path)
+
+    def record(self, dependency, row):
+        return row
+
+
+class NdjsonReportWriter(ReportWriter):
+    "One JSON object per line"
+
+    def __init__(self, path):
+        "Open path for writing, replacing any earlier report"
+        self.file = open(path, 'w', encoding='utf-8')
+        self.flushed_at = time.monotonic()
+
+    def write(self, dependency, row):
+        self.file.write(json.dumps(report_record(dependency, row)) + '\n')
+        if time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.flushed_at = time.monotonic()
+
+    def close(self):
+        self.file.close()
+
+
+class SqliteReportWriter(ReportWriter):
+    "A dependencies table plus one view per ecosystem, queryable without loading the report"
+
+    def __init__(self, path):
+        "Replace any previous report at path"
+        if os.path.exists(path):
+            os.remove(path)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=OFF')
+        self.connection.execute('PRAGMA synchronous=OFF')
+        self.connection.execute(f"CREATE TABLE dependencies ({', '.join(f'{field} TEXT' for field in REPORT_FIELDS)})")
+        self.connection.executescript(
+            "CREATE VIEW maven_dependencies AS SELECT repository, manifest,"
+            " substr(name, 1, instr(name, ':') - 1) AS group_id, substr(name, instr(name, ':') + 1) AS artifact_id,"
+            " current_version, latest_version, upgrade_type, vulnerabilities, introduced_by"
+            " FROM dependencies WHERE ecosystem = 'maven';"
+            "CREATE VIEW pypi_dependencies AS SELECT repository, manifest, name AS package_name,"
+            " current_version, latest_version, upgrade_type, vulnerabilities, introduced_by"
+            " FROM dependencies WHERE ecosystem = 'pypi';"
+            "CREATE VIEW rubygems_dependencies AS SELECT repository, manifest, name AS gem_name,"
+            " current_version, latest_version, upgrade_type, vulnerabilities, introduced_by"
+            " FROM dependencies WHERE ecosystem = 'rubygems';"
+        )
+        self.insert = f"INSERT INTO dependencies VALUES ({', '.join('?' * len(REPORT_FIELDS))})"
+        self.pending = []
+
+    def write(self, dependency, row):
+        record = report_record(dependency, row)
+        self.pending.append([record[field] for field in REPORT_FIELDS])
+        if len(self.pending) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        with self.connection:
+            self.connection.executemany(self.insert, self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        # Indexes are built once at the end, which is much cheaper than maintaining them per insert
+        self.connection.execute('CREATE INDEX dependencies_package ON dependencies (ecosystem, name)')
+        self.connection.execute('CREATE INDEX dependencies_repository ON dependencies (repository)')
+        self.connection.commit()
+        self.connection.close()
+
+
+class ParquetReportWriter(ReportWriter):
+    "Columnar report, written in row groups of BATCH_SIZE rows; needs pyarrow"
+
+    def __init__(self, path):
+        "Start a Parquet file at path; raises RuntimeError if pyarrow is not installed"
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet reports need pyarrow (pip install pyarrow)") from None
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(field, pyarrow.string()) for field in REPORT_FIELDS])
+        # Dictionary encoding keeps repeated ecosystems, repositories and versions small
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression='zstd', use_dictionary=True)
+        self.columns = {field: [] for field in REPORT_FIELDS}
+        self.count = 0
+
+    def write(self, dependency, row):
+        record = report_record(dependency, row)
+        for field in REPORT_FIELDS:
+            self.columns[field].append(record[field])
+        self.count += 1
+        if self.count >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.count:
+            self.writer.write_table(self.pyarrow.table(self.columns, schema=self.schema))
+            self.columns = {field: [] for field in REPORT_FIELDS}
+            self.count = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+REPORT_WRITERS = {
+    'legacy-csv': LegacyCsvReportWriter,
+    'csv': CsvReportWriter,
+    'ndjson': NdjsonReportWriter,
+    'sqlite': SqliteReportWriter,
+    'parquet': ParquetReportWriter,
+}
+
+# Default file extension for each format
+REPORT_EXTENSIONS = {
+    'legacy-csv': 'csv',
+    'csv': 'csv',
+    'ndjson': 'ndjson',
+    'sqlite': 'sqlite3',
+    'parquet': 'parquet',
+}
+
+
+def open_report(report_format, path, leading_fields=()):
+    "Open a report writer for one of REPORT_WRITERS"
+    if report_format == 'legacy-csv':
+        return LegacyCsvReportWriter(path, leading_fields)
+    return REPORT_WRITERS[report_format](path)
@@ -0,0 +1,39 @@
+import re
+from concurrent.futures import as_completed
+
+
+def normalize_name(ecosystem, name):
+    "Normalize a package name so that equivalent spellings share one lookup"
+    if ecosystem == 'pypi':
+        # PEP 503: runs of -, _ and . are equivalent and names are case-insensitive
+        return re.sub(r'[-_.]+', '-', name).lower()
+    if ecosystem == 'rubygems':
+        return name.lower()
+    # Maven group:artifact coordinates are compared exactly
+    return name
+
+
+class ResolutionPlan:
+    "Collects coordinates from every manifest so that each unique one is looked up once"
+
+    def __init__(self):
+        self.names = {}
+        self.requested = 0
+
+    def add(self, ecosystem, name):
+        "Register a coordinate and return the key its result will be stored under"
+        key = (ecosystem, normalize_name(ecosystem, name))
+        self.requested += 1
+        # The first spelling seen is the one sent to the registry
+        self.names.setdefault(key, name)
+        return key
+
+    @property
+    def saved_lookups(self):
+        return self.requested - len(self.names)
+
+    def resolve_as_completed(self, lookups, executor):
+        "Run one lookup per unique key, yielding (key, stable version) pairs as each finishes"
+        futures = {executor.submit(lookups[key[0]], name): key for key, name in self.names.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scan_metrics import metrics
+
+# Resolved versions kept in memory
+DEFAULT_MAX_ENTRIES = 50000
+
+# Seconds a resolved version is served before it must be looked up again
+DEFAULT_TTL = 15 * 60
+
+# Seconds a "not found" answer is served; shorter, so new releases show up quickly
+DEFAULT_NEGATIVE_TTL = 60
+
+# Entries hit at least this often since their last fetch are refreshed before they expire
+HOT_THRESHOLD = 2
+
+# Seconds between background refresh passes
+REFRESH_INTERVAL = 30
+
+
+class CacheEntry:
+    __slots__ = ('version', 'fetched_at', 'hits')
+
+    def __init__(self, version, fetched_at):
+        "A looked-up version (None if not found) and the time.monotonic() it was fetched at"
+        self.version = version
+        self.fetched_at = fetched_at
+        self.hits = 0
+
+
+class ResolverService:
+    "Long-lived resolver: in-memory LRU of versions, single-flight lookups and background refresh of hot entries"
+
+    def __init__(self, lookups, max_workers, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, refresh_interval=REFRESH_INTERVAL):
+        "lookups maps ecosystem -> function(name) returning the stable version"
+        self.lookups = lookups
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.names = {}
+        self.inflight = {}
+        # Re-entrant: a lookup that is already done runs its callback, which takes the lock, immediately
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.refresh_interval = refresh_interval
+        self.refresher = None
+        if refresh_interval:
+            self.refresher = threading.Thread(target=self.refresh_loop, args=(refresh_interval,), daemon=True)
+            self.refresher.start()
+
+    def expires_after(self, entry):
+        return self.ttl if entry.version is not None else self.negative_ttl
+
+    def lookup(self, key, name):
+        "Return a Future for key: already resolved from memory, joined to a lookup in flight, or a new lookup"
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at < self.expires_after(entry):
+                self.entries.move_to_end(key)
+                entry.hits += 1
+                future = Future()
+                future.set_result(entry.version)
+                metrics.increment('resolver', 'hit')
+                return future
+            future = self.inflight.get(key)
+            if future is not None:
+                metrics.increment('resolver', 'coalesced')
+                return future
+            metrics.increment('resolver', 'miss')
+            return self.start(key, name)
+
+    def start(self, key, name):
+        # Caller must hold self.lock
+        future = self.executor.submit(self.lookups[key[0]], name)
+        self.inflight[key] = future
+        self.names[key] = name
+        future.add_done_callback(lambda _: self.finished(key, future))
+        return future
+
+    def finished(self, key, future):
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if future.cancelled() or future.exception() is not None:
+                # Errors are not cached; the next request tries again
+                if key not in self.entries:
+                    self.names.pop(key, None)
+                return
+            self.entries[key] = CacheEntry(future.result(), time.monotonic())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self.names.pop(evicted, None)
+
+    def refresh_loop(self, interval):
+        while not self.stopped.wait(interval):
+            self.refresh()
+
+    def refresh(self):
+        "Re-fetch hot entries that will expire before the next pass, so their requests never wait"
+        now = time.monotonic()
+        with self.lock:
+            for key, entry in list(self.entries.items()):
+                if entry.hits < HOT_THRESHOLD or key in self.inflight:
+                    continue
+                if now - entry.fetched_at + (self.refresh_interval or 0) >= self.expires_after(entry):
+                    # The old value keeps being served until the new one lands
+                    entry.hits = 0
+                    metrics.increment('resolver', 'refresh')
+                    self.start(key, self.names[key])
+
+    def close(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,60 @@
+import registry_cache
+import registry_client
+from version_ordering import is_prerelease, latest_stable
+
+
+def latest_url(name):
+    return f"{registry_client.RUBYGEMS_URL}/api/v1/versions/{name}/latest.json"
+
+
+def compact_index_url(name):
+    return f"{registry_client.RUBYGEMS_URL}/info/{name}"
+
+
+def extract_latest(response):
+    "Cache body for latest.json: the version it names, or '' for gems it does not know"
+    version = response.json().get('version')
+    return version if version and version != 'unknown' else ''
+
+
+def iter_lines(chunks):
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def read_compact_versions(lines):
+    "Versions listed in a compact index info file, without platform suffixes"
+    versions = set()
+    started = False
+    for line in lines:
+        if not started:
+            started = line.startswith(b'---')
+            continue
+        if line:
+            # "1.2.0-x86_64-linux dep:>= 1|checksum:..."
+            versions.add(line.split(b' ', 1)[0].split(b'-', 1)[0].decode('utf-8'))
+    return versions
+
+
+def extract_compact_latest(response):
+    "Cache body for a compact index info file: the newest stable version, or ''"
+    versions = read_compact_versions(iter_lines(registry_client.iter_content(response)))
+    return latest_stable('rubygems', versions) or ''
+
+
+def get_latest_version(name):
+    "Return the newest stable version of a gem, or None"
+    # latest.json is a few bytes; the compact index is only read when it names a pre-release
+    version = registry_cache.get_extracted('rubygems', f"latest:{name}", latest_url(name), extract_latest)
+    if version == '':
+        return None
+    if version is not None and not is_prerelease('rubygems', version):
+        return version
+    version = registry_cache.get_extracted('rubygems', f"info:{name}", compact_index_url(name),
+                                           extract_compact_latest, stream=True)
+    return version or None
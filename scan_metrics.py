@@ -0,0 +1,209 @@
+import functools
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Prefix of every metric name on /metrics
+PREFIX = 'dependency_analyser'
+
+# inspect.CO_GENERATOR, without importing inspect at startup
+CO_GENERATOR = 0x20
+
+
+class Histogram:
+    "Fixed-bucket latency histogram"
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        "Upper bound of the bucket holding the q-th quantile (the maximum for the +Inf bucket)"
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'seconds': round(self.sum, 6),
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else None,
+            'p50_ms': None if not self.count else round(self.quantile(0.5) * 1000, 3),
+            'p99_ms': None if not self.count else round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    "Per-stage latency histograms and event counters, safe to update from any thread"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def observe(self, stage, label, seconds):
+        "Record one timing of a stage, e.g. observe('lookup', 'pypi', 0.12)"
+        with self.lock:
+            histogram = self.histograms.get((stage, label))
+            if histogram is None:
+                histogram = self.histograms[(stage, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, event, label, amount=1):
+        "Count an event, e.g. increment('cache', 'pypi:hit') or increment('http_bytes', host, n)"
+        with self.lock:
+            self.counters[(event, label)] = self.counters.get((event, label), 0) + amount
+
+    def timed(self, stage, label):
+        return Timer(self, stage, label)
+
+    def instrumented(self, stage, label):
+        "Decorator timing every call; generator functions are timed until exhausted or closed"
+        def decorate(function):
+            if function.__code__.co_flags & CO_GENERATOR:
+                @functools.wraps(function)
+                def generator_wrapper(*args, **kwargs):
+                    with self.timed(stage, label):
+                        yield from function(*args, **kwargs)
+                return generator_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timed(stage, label):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def summary(self):
+        "JSON-serialisable run summary, with cache hit rates per ecosystem"
+        with self.lock:
+            stages = {}
+            for (stage, label), histogram in sorted(self.histograms.items()):
+                stages.setdefault(stage, {})[label] = histogram.summary()
+            counters = {}
+            for (event, label), value in sorted(self.counters.items()):
+                counters.setdefault(event, {})[label] = value
+        hit_rates = {}
+        for label, value in counters.get('cache', {}).items():
+            ecosystem, result = label.rsplit(':', 1)
+            hit_rates.setdefault(ecosystem, {'hit': 0, 'total': 0})
+            hit_rates[ecosystem]['total'] += value
+            if result in ('hit', 'revalidated'):
+                hit_rates[ecosystem]['hit'] += value
+        return {
+            'elapsed_seconds': round(time.time() - self.started, 3),
+            'stages': stages,
+            'counters': counters,
+            'cache_hit_rate': {ecosystem: round(rate['hit'] / rate['total'], 4)
+                               for ecosystem, rate in hit_rates.items() if rate['total']},
+        }
+
+    def prometheus(self):
+        "Prometheus text exposition of every histogram and counter"
+        lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+        with self.lock:
+            histograms = sorted((key, list(h.counts), h.count, h.sum) for key, h in self.histograms.items())
+            counters = sorted(self.counters.items())
+        for (stage, label), counts, count, total in histograms:
+            labels = f'stage="{escape(stage)}",label="{escape(label)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{{labels}}} {total}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{{labels}}} {count}')
+        lines.append(f"# TYPE {PREFIX}_events_total counter")
+        for (event, label), value in counters:
+            lines.append(f'{PREFIX}_events_total{{event="{escape(event)}",label="{escape(label)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Timer:
+    "Context manager recording the time spent inside it"
+    __slots__ = ('metrics', 'stage', 'label', 'started')
+
+    def __init__(self, metrics, stage, label):
+        "Time a block into the metrics histogram for (stage, label)"
+        self.metrics = metrics
+        self.stage = stage
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.stage, self.label, time.perf_counter() - self.started)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.metrics.increment(f"{self.stage}_errors", self.label)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class ThreadProfiler:
+    """cProfile across the main thread and worker threads.
+
+    Before Python 3.12 cProfile only sees the thread that enabled it, so each worker enables its own
+    profile. From 3.12 cProfile is built on sys.monitoring: the main thread's profile already covers
+    every thread, and enabling a second one raises ValueError."""
+
+    def __init__(self):
+        "Start profiling the calling thread"
+        import cProfile
+        self.lock = threading.Lock()
+        self.profiles = [cProfile.Profile()]
+        self.profiles[0].enable()
+
+    def profile_thread(self):
+        "Executor initializer: profile the worker thread it runs in"
+        if sys.version_info >= (3, 12):
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def dump(self, path):
+        "Stop profiling and write the merged stats, readable with pstats or snakeviz"
+        import pstats
+        self.profiles[0].disable()
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+
+# Process-wide metrics shared by the parsers, lookups, cache and HTTP client
+metrics = Metrics()
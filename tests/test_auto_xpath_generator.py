@@ -0,0 +1,107 @@
+import importlib.util
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+pytest.importorskip('lxml')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+# auto-xpath-generator.py is a script, not an importable module name
+spec = importlib.util.spec_from_file_location(
+    'auto_xpath_generator', os.path.join(HERE, os.pardir, 'auto-xpath-generator.py'))
+auto_xpath_generator = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(auto_xpath_generator)
+XpathUtil = auto_xpath_generator.XpathUtil
+
+
+class FakeDriver:
+    "Records execute_script calls and answers every locator with a fixed count"
+
+    def __init__(self, count=1):
+        self.count = count
+        self.calls = []
+
+    def execute_script(self, script, locators):
+        self.calls.append(list(locators))
+        return [self.count] * len(locators)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def test_count_offline_counts_matches_in_the_saved_page():
+    page = read_fixture('login.html')
+    counts = {}
+    remaining = XpathUtil().count_offline(page, [
+        "//input[@id='username']",
+        "//input[@name='q']",
+        "//input[@type='search']",
+        "//input[@id='missing']",
+        "//input[@value='it's']",
+    ], counts)
+
+    assert counts == {
+        "//input[@id='username']": 1,
+        "//input[@name='q']": 2,
+        "//input[@type='search']": 2,
+        "//input[@id='missing']": 0,
+    }
+    # Not valid XPath: left for the browser
+    assert remaining == ["//input[@value='it's']"]
+
+
+def test_generate_xpath_needs_no_browser(capsys):
+    page = read_fixture('login.html')
+
+    assert XpathUtil().generate_xpath(BeautifulSoup(page, 'html.parser'), page) is True
+
+    output = capsys.readouterr().out
+    assert "input_username = //input[@id='username']" in output
+    assert "input_password = //input[@id='password']" in output
+    assert "input_Archive search = //input[@title='Archive search']" in output
+    # Shared by two inputs, so never offered as a locator
+    assert "//input[@name='q']" not in output
+
+
+def test_locators_lxml_cannot_evaluate_go_to_the_browser_in_one_call():
+    page = read_fixture('login.html')
+    driver = FakeDriver()
+
+    XpathUtil(driver).generate_xpath(BeautifulSoup(page, 'html.parser'), page)
+
+    assert driver.calls == [["//input[@value='it's']"]]
+
+
+def test_browser_checks_are_batched_into_one_call():
+    page = read_fixture('login.html')
+    driver = FakeDriver()
+    xpath_util = XpathUtil(driver, offline=False)
+
+    xpath_util.generate_xpath(BeautifulSoup(page, 'html.parser'), page)
+
+    assert len(driver.calls) == 1
+    assert set(driver.calls[0]) == set(xpath_util.candidate_locators(BeautifulSoup(page, 'html.parser')))
+
+
+def test_counts_are_cached_per_page_hash(tmp_path):
+    page = read_fixture('login.html')
+    cache_path = str(tmp_path / 'counts.json')
+    first = FakeDriver()
+    XpathUtil(first, offline=False, cache_path=cache_path).generate_xpath(BeautifulSoup(page, 'html.parser'), page)
+
+    # Same page again, from the cache file: no browser call
+    second = FakeDriver()
+    XpathUtil(second, offline=False, cache_path=cache_path).generate_xpath(BeautifulSoup(page, 'html.parser'), page)
+    assert len(first.calls) == 1
+    assert second.calls == []
+
+    # A changed page hashes differently and is counted again
+    changed = page.replace('Archive search', 'Old search')
+    XpathUtil(second, offline=False, cache_path=cache_path).generate_xpath(
+        BeautifulSoup(changed, 'html.parser'), changed)
+    assert len(second.calls) == 1
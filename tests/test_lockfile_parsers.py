@@ -0,0 +1,202 @@
+import io
+import json
+
+from lockfile_parsers import (parse_gemfile_lock, parse_gradle_lockfile, parse_maven_dependency_list,
+                              parse_pipfile_lock, parse_poetry_lock)
+from manifest_parsers import Dependency
+
+GEMFILE_LOCK = """\
+GIT
+  remote: https://github.com/rails/rails.git
+  revision: 0123456789abcdef
+  specs:
+    rails (7.1.0.alpha)
+
+GEM
+  remote: https://rubygems.org/
+  specs:
+    actionpack (7.0.4)
+      rack (~> 2.0, >= 2.2.0)
+    nokogiri (1.15.4-arm64-darwin)
+      racc (~> 1.4)
+    nokogiri (1.15.4-x86_64-linux)
+      racc (~> 1.4)
+    rack (2.2.8)
+
+PLATFORMS
+  x86_64-linux
+
+DEPENDENCIES
+  actionpack
+  nokogiri
+
+BUNDLED WITH
+   2.4.10
+"""
+
+POETRY_LOCK = """\
+# This file is automatically @generated by Poetry 1.7.1 and should not be changed by hand.
+
+[[package]]
+name = "certifi"
+version = "2024.2.2"
+description = "Python package for providing Mozilla's CA Bundle."
+optional = false
+python-versions = ">=3.6"
+files = [
+    {file = "certifi-2024.2.2-py3-none-any.whl", hash = "sha256:dc383c07b76109f368f6106eee2b593b04a011ea4d55f652c6ca24a754d1cdd1"},
+]
+
+[[package]]
+name = 'requests'
+version = '2.31.0'
+description = "Python HTTP for Humans."
+optional = false
+python-versions = ">=3.7"
+
+[package.dependencies]
+certifi = ">=2017.4.17"
+version = "not the package version"
+
+[package.extras]
+socks = ["PySocks (>=1.5.6,!=1.5.7)"]
+
+[[package]]
+name = "internal-tools"
+version = "0.1.0"
+description = ""
+
+[package.source]
+type = "git"
+url = "https://example.com/internal-tools.git"
+reference = "main"
+
+[[package]]
+name = "idna"
+version = "3.6"
+description = "Internationalized Domain Names in Applications (IDNA)"
+
+[package.source]
+type = "legacy"
+url = "https://mirror.example.com/simple"
+reference = "mirror"
+
+[metadata]
+lock-version = "2.0"
+python-versions = "^3.9"
+content-hash = "0123456789abcdef"
+"""
+
+PIPFILE_LOCK = {
+    '_meta': {
+        'hash': {'sha256': '0123456789abcdef'},
+        'pipfile-spec': 6,
+        'requires': {'python_version': '3.11'},
+        'sources': [{'name': 'pypi', 'url': 'https://pypi.org/simple', 'verify_ssl': True}],
+    },
+    'default': {
+        'certifi': {
+            'hashes': ['sha256:0123', 'sha256:4567'],
+            'index': 'pypi',
+            'markers': "python_version >= '3.6'",
+            'version': '==2024.2.2',
+        },
+        'requests': {'hashes': ['sha256:89ab'], 'index': 'pypi', 'version': '==2.31.0'},
+        'internal-tools': {'editable': True, 'path': '.'},
+    },
+    'develop': {
+        'certifi': {'hashes': ['sha256:0123'], 'version': '==2024.2.2'},
+        'pytest': {'extras': ['testing'], 'hashes': ['sha256:cdef'], 'version': '==8.0.0'},
+    },
+}
+
+GRADLE_LOCKFILE = """\
+# This is a Gradle generated file for dependency locking.
+# Manual edits can break the build and are not advised.
+# This file is expected to be part of source control.
+com.google.guava:failureaccess:1.0.1=compileClasspath,runtimeClasspath
+com.google.guava:guava:32.1.2-jre=compileClasspath,runtimeClasspath
+empty=annotationProcessor
+"""
+
+# A Gradle 6 per-configuration lockfile has no configurations after the coordinates
+GRADLE_6_LOCKFILE = """\
+# This is a Gradle generated file for dependency locking.
+org.slf4j:slf4j-api:2.0.9
+"""
+
+MAVEN_DEPENDENCY_LIST = """\
+[INFO] Scanning for projects...
+[INFO]
+[INFO] --- dependency:3.6.0:list (default-cli) @ app ---
+[INFO]
+[INFO] The following files have been resolved:
+[INFO]    org.slf4j:slf4j-api:jar:2.0.9:compile -- module org.slf4j [auto]
+[INFO]    io.netty:netty-transport-native-epoll:jar:linux-x86_64:4.1.100.Final:runtime
+[INFO]    junit:junit:jar:4.13.2:test (optional)
+[INFO]    org.slf4j:slf4j-api:jar:2.0.9:runtime
+[INFO]
+[INFO] BUILD SUCCESS
+"""
+
+
+def pipenv_layout(data):
+    "Pipfile.lock as pipenv writes it: one key per line, four-space indent, trailing newline"
+    return json.dumps(data, indent=4, sort_keys=True) + '\n'
+
+
+def test_gemfile_lock_reads_gem_specs_once_per_version():
+    assert list(parse_gemfile_lock(io.StringIO(GEMFILE_LOCK))) == [
+        Dependency('rubygems', 'actionpack', '7.0.4'),
+        Dependency('rubygems', 'nokogiri', '1.15.4'),
+        Dependency('rubygems', 'rack', '2.2.8'),
+    ]
+
+
+def test_poetry_lock_reads_index_packages_only():
+    assert list(parse_poetry_lock(io.StringIO(POETRY_LOCK))) == [
+        Dependency('pypi', 'certifi', '2024.2.2'),
+        Dependency('pypi', 'requests', '2.31.0'),
+        Dependency('pypi', 'idna', '3.6'),
+    ]
+
+
+def test_pipfile_lock_follows_the_key_path():
+    assert list(parse_pipfile_lock(io.StringIO(pipenv_layout(PIPFILE_LOCK)))) == [
+        Dependency('pypi', 'certifi', '2024.2.2'),
+        Dependency('pypi', 'requests', '2.31.0'),
+        Dependency('pypi', 'pytest', '8.0.0'),
+    ]
+
+
+def test_pipfile_lock_in_another_layout_is_loaded_whole():
+    dependencies = list(parse_pipfile_lock(io.StringIO(json.dumps(PIPFILE_LOCK))))
+    assert dependencies == [
+        Dependency('pypi', 'certifi', '2024.2.2'),
+        Dependency('pypi', 'requests', '2.31.0'),
+        Dependency('pypi', 'certifi', '2024.2.2'),
+        Dependency('pypi', 'pytest', '8.0.0'),
+    ]
+
+
+def test_pipfile_lock_accepts_binary_uploads():
+    upload = io.BytesIO(pipenv_layout(PIPFILE_LOCK).encode('utf-8'))
+    assert Dependency('pypi', 'requests', '2.31.0') in list(parse_pipfile_lock(upload))
+
+
+def test_gradle_lockfile_skips_comments_and_empty_configurations():
+    assert list(parse_gradle_lockfile(io.StringIO(GRADLE_LOCKFILE))) == [
+        Dependency('maven', 'com.google.guava:failureaccess', '1.0.1'),
+        Dependency('maven', 'com.google.guava:guava', '32.1.2-jre'),
+    ]
+    assert list(parse_gradle_lockfile(io.StringIO(GRADLE_6_LOCKFILE))) == [
+        Dependency('maven', 'org.slf4j:slf4j-api', '2.0.9'),
+    ]
+
+
+def test_maven_dependency_list_reads_each_coordinate_once():
+    assert list(parse_maven_dependency_list(io.StringIO(MAVEN_DEPENDENCY_LIST))) == [
+        Dependency('maven', 'org.slf4j:slf4j-api', '2.0.9'),
+        Dependency('maven', 'io.netty:netty-transport-native-epoll', '4.1.100.Final'),
+        Dependency('maven', 'junit:junit', '4.13.2'),
+    ]
@@ -0,0 +1,131 @@
+import pytest
+
+from version_ordering import (extract_version, is_newer, is_prerelease, latest_satisfying, latest_stable,
+                              pep440_satisfies, upgrade_kind, version_key)
+
+# Each list is in ascending order under its ecosystem's rules
+ASCENDING = [
+    ('pypi', ['1.0.dev1', '1.0a1.dev1', '1.0a1', '1.0b2', '1.0rc1', '1.0', '1.0+local', '1.0.post1', '1.0.1',
+              '1.10', '1!0.1']),
+    # "-" reads as ".pre.", and string segments sort before numbers and before the release
+    ('rubygems', ['1.0.0.pre.x86', '1.0.0.pre', '1.0.0.rc1', '1.0.0', '1.0.1', '1.10']),
+    # ComparableVersion: alpha < beta < milestone < rc < SNAPSHOT < release < sp < unknown qualifiers < numbers
+    ('maven', ['1.0-alpha1', '1.0-beta1', '1.0-M1', '1.0-rc1', '1.0-SNAPSHOT', '1.0', '1.0-sp1', '1.0-foo',
+               '1.0.1', '1.10']),
+]
+
+EQUAL = [
+    ('pypi', '1.0', '1.0.0'),
+    ('pypi', '1.0rc1', '1.0-RC-1'),
+    ('rubygems', '1.0', '1.0.0'),
+    ('maven', '1.0.Final', '1.0'),
+    ('maven', '1.0.0', '1'),
+    ('maven', '1.0-ga', '1.0'),
+]
+
+
+@pytest.mark.parametrize('ecosystem, versions', ASCENDING)
+def test_versions_sort_in_ecosystem_order(ecosystem, versions):
+    for lower, higher in zip(versions, versions[1:]):
+        assert version_key(ecosystem, lower) < version_key(ecosystem, higher), (lower, higher)
+
+
+@pytest.mark.parametrize('ecosystem, first, second', EQUAL)
+def test_equivalent_spellings_compare_equal(ecosystem, first, second):
+    assert version_key(ecosystem, first) == version_key(ecosystem, second)
+
+
+@pytest.mark.parametrize('ecosystem, version', [('pypi', 'not a version'), ('pypi', ''), ('maven', '')])
+def test_unparseable_versions_have_no_key(ecosystem, version):
+    assert version_key(ecosystem, version) is None
+
+
+@pytest.mark.parametrize('ecosystem, version, expected', [
+    ('pypi', '1.0rc1', True),
+    ('pypi', '1.0.dev3', True),
+    ('pypi', '1.0.post1', False),
+    ('rubygems', '2.0.beta', True),
+    ('rubygems', '2.0', False),
+    ('maven', '1.0-SNAPSHOT', True),
+    ('maven', '1.0-M2', True),
+    ('maven', '1.0-sp1', False),
+    ('maven', '1.0.Final', False),
+])
+def test_is_prerelease(ecosystem, version, expected):
+    assert is_prerelease(ecosystem, version) is expected
+
+
+@pytest.mark.parametrize('ecosystem, versions, expected', [
+    ('pypi', ['1.0', '2.0rc1', '1.5'], '1.5'),
+    ('maven', ['1.0', '2.0-SNAPSHOT', '1.0-sp1'], '1.0-sp1'),
+    ('rubygems', ['1.0', '2.0.beta'], '1.0'),
+    ('pypi', ['2.0rc1', 'bogus'], None),
+])
+def test_latest_stable(ecosystem, versions, expected):
+    assert latest_stable(ecosystem, versions) == expected
+
+
+@pytest.mark.parametrize('ecosystem, candidate, current, expected', [
+    ('rubygems', '3.150', '~> 3.142', True),
+    ('rubygems', '3.142', '~> 3.142', False),
+    ('pypi', '2.10.0', '>=2.9.0', True),
+    ('pypi', '2.9.0', '>=2.9.0', False),
+    ('pypi', '1.0', '1.0.post1', False),
+    ('maven', '1.0.1', '[1.0,2.0)', True),
+    # Neither side parses: any difference counts as newer, as before version ordering existed
+    ('maven', 'weird', 'other', True),
+])
+def test_is_newer_with_requirement_strings(ecosystem, candidate, current, expected):
+    assert is_newer(ecosystem, candidate, current) is expected
+
+
+@pytest.mark.parametrize('ecosystem, current, candidate, expected', [
+    ('pypi', '1.2.3', '2.0', 'major'),
+    ('pypi', '~=1.2.3', '1.3.0', 'minor'),
+    ('pypi', '1.2.3', '1.2.4', 'patch'),
+    ('pypi', '1.2.3', '1.2.3', ''),
+    ('maven', '1.0', '1.0.1', 'patch'),
+    ('rubygems', '~> 3.142', '4.0', 'major'),
+])
+def test_upgrade_kind(ecosystem, current, candidate, expected):
+    assert upgrade_kind(ecosystem, current, candidate) == expected
+
+
+@pytest.mark.parametrize('requirement, expected', [
+    ('~> 3.142', '3.142'),
+    ('[1.0,2.0)', '1.0'),
+    ('>=2.9.0', '2.9.0'),
+    ('', None),
+])
+def test_extract_version(requirement, expected):
+    assert extract_version(requirement) == expected
+
+
+@pytest.mark.parametrize('version, specifier, expected', [
+    ('3.6', '<4,>=2.5', True),
+    ('4.0', '<4,>=2.5', False),
+    ('1.4.9', '~=1.4.2', True),
+    ('1.5.0', '~=1.4.2', False),
+    ('1.5.0', '~=1.4', True),
+    ('1.4.0', '==1.4.*', True),
+    ('1.5.0', '!=1.4.*', True),
+    ('1.5.6', '!=1.5.7,>=1.5.6', True),
+    ('1.0.0', '==1.0', True),
+    ('1.0', '===1.0', True),
+    ('1.0.0', '===1.0', False),
+    ('1.0', 'bogus', False),
+])
+def test_pep440_satisfies(version, specifier, expected):
+    assert pep440_satisfies(version, specifier) is expected
+
+
+@pytest.mark.parametrize('specifier, expected', [
+    ('<4,>=2.5', '3.6'),
+    ('~=1.4', '1.5.0'),
+    ('', '3.6'),
+    # A pre-release is only picked when nothing stable satisfies the specifier
+    ('>=3.7', '4.0rc1'),
+    ('>=5', None),
+])
+def test_latest_satisfying(specifier, expected):
+    assert latest_satisfying(['1.4.1', '1.5.0', '2.4', '3.6', '4.0rc1'], specifier) == expected
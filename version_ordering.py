@@ -0,0 +1,258 @@
+import operator
+import re
+from functools import lru_cache
+
+# PEP 440 version scheme, as published in the specification's appendix
+PEP440_VERSION = re.compile(r'''
+    ^\s*v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)[-_.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+''', re.VERBOSE | re.IGNORECASE)
+
+PEP440_PRE_RANK = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'c': 2, 'rc': 2, 'pre': 2, 'preview': 2}
+
+# Maven ComparableVersion qualifier order; anything unknown sorts after "sp"
+MAVEN_QUALIFIER_RANK = {
+    'alpha': 0, 'a': 0,
+    'beta': 1, 'b': 1,
+    'milestone': 2, 'm': 2,
+    'rc': 3, 'cr': 3,
+    'snapshot': 4,
+    '': 5, 'ga': 5, 'final': 5, 'release': 5,
+    'sp': 6,
+}
+MAVEN_RELEASE_RANK = 5
+MAVEN_UNKNOWN_RANK = 7
+
+# Sorts after any string segment and before any positive number, standing in
+# for the implicit zero / release padding when versions differ in length
+END = (0.5,)
+
+SEGMENTS = re.compile(r'\d+|[a-zA-Z]+')
+
+# One clause of a PEP 440 specifier such as ">=2.5,<4"
+SPECIFIER_CLAUSE = re.compile(r'^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+?)\s*$')
+
+SPECIFIER_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne,
+    '<=': operator.le, '>=': operator.ge,
+    '<': operator.lt, '>': operator.gt,
+}
+
+# First version-looking token in a requirement such as "~> 3.142" or ">=2.9.0"
+VERSION_TOKEN = re.compile(r'\d[0-9A-Za-z.+!_-]*')
+
+
+def strip_trailing_zeros(segments):
+    segments = list(segments)
+    while segments and segments[-1] == 0:
+        segments.pop()
+    return segments
+
+
+def pep440_key(version):
+    match = PEP440_VERSION.match(version)
+    if not match:
+        return None
+    epoch = int(match.group('epoch') or 0)
+    release = tuple(strip_trailing_zeros(int(part) for part in match.group('release').split('.')))
+
+    if match.group('pre_l'):
+        pre = (PEP440_PRE_RANK[match.group('pre_l').lower()], int(match.group('pre_n') or 0))
+    elif match.group('dev') and not match.group('post'):
+        # 1.0.dev1 sorts before 1.0a1
+        pre = (-1,)
+    else:
+        pre = (3,)
+
+    if match.group('post'):
+        post = int(match.group('post_n1') or match.group('post_n2') or 0)
+    else:
+        post = -1
+
+    dev = (0, int(match.group('dev_n') or 0)) if match.group('dev') else (1,)
+
+    local = ()
+    if match.group('local'):
+        local = tuple((1, int(part)) if part.isdigit() else (0, part.lower())
+                      for part in re.split(r'[-_.]', match.group('local')))
+    return epoch, release, pre, post, dev, local
+
+
+def rubygems_segments(version):
+    # Gem::Version treats "-" as ".pre." and splits digit/letter runs into segments
+    version = version.strip().replace('-', '.pre.')
+    segments = [int(part) if part.isdigit() else part for part in SEGMENTS.findall(version)]
+    if not segments:
+        return None
+    # Canonical segments drop trailing zeros from both the release and prerelease part
+    first_string = next((i for i, part in enumerate(segments) if isinstance(part, str)), len(segments))
+    return strip_trailing_zeros(segments[:first_string]) + strip_trailing_zeros(segments[first_string:])
+
+
+def rubygems_key(version):
+    segments = rubygems_segments(version)
+    if segments is None:
+        return None
+    return tuple((1, part) if isinstance(part, int) else (0, part) for part in segments) + (END,)
+
+
+def maven_items(version):
+    items = []
+    for part in SEGMENTS.findall(version.strip().lower()):
+        if part.isdigit():
+            items.append((2, int(part)))
+        else:
+            items.append((1, MAVEN_QUALIFIER_RANK.get(part, MAVEN_UNKNOWN_RANK),
+                          '' if part in MAVEN_QUALIFIER_RANK else part))
+    # Zeros ending a numeric run ("1.0-alpha" is "1-alpha") and trailing zeros or
+    # release qualifiers ("1.0.0.Final") do not change the version
+    normalized = []
+    for item in items:
+        if item[0] == 1:
+            while normalized and normalized[-1] == (2, 0):
+                normalized.pop()
+        normalized.append(item)
+    while normalized and normalized[-1] in ((2, 0), (1, MAVEN_RELEASE_RANK, '')):
+        normalized.pop()
+    return normalized
+
+
+def maven_key(version):
+    items = maven_items(version)
+    if not items and not version.strip():
+        return None
+    # Padding compares like the release qualifier
+    return tuple(items) + ((1, MAVEN_RELEASE_RANK, ''),)
+
+
+KEY_FUNCTIONS = {
+    'pypi': pep440_key,
+    'rubygems': rubygems_key,
+    'maven': maven_key,
+}
+
+
+@lru_cache(maxsize=65536)
+def version_key(ecosystem, version):
+    "Return a sortable key for version under the ecosystem's rules, or None if it cannot be parsed"
+    if not version:
+        return None
+    return KEY_FUNCTIONS[ecosystem](version)
+
+
+@lru_cache(maxsize=65536)
+def is_prerelease(ecosystem, version):
+    "True for alpha/beta/rc/dev/snapshot style versions"
+    if ecosystem == 'pypi':
+        match = PEP440_VERSION.match(version)
+        return bool(match and (match.group('pre') or match.group('dev')))
+    if ecosystem == 'rubygems':
+        segments = rubygems_segments(version)
+        return bool(segments) and any(isinstance(part, str) for part in segments)
+    return any(item[0] == 1 and item[1] < MAVEN_RELEASE_RANK for item in maven_items(version))
+
+
+def latest_stable(ecosystem, versions):
+    "Return the highest non-pre-release version, or None"
+    stable = [v for v in versions if version_key(ecosystem, v) is not None and not is_prerelease(ecosystem, v)]
+    if not stable:
+        return None
+    return max(stable, key=lambda v: version_key(ecosystem, v))
+
+
+def release_prefix_matches(version, prefix):
+    "True if the release segments of a PEP 440 version start with prefix, e.g. '1.4' for '1.4.2'"
+    release = release_numbers('pypi', version)
+    try:
+        numbers = [int(part) for part in prefix.split('.')]
+    except ValueError:
+        return False
+    return (release + [0] * len(numbers))[:len(numbers)] == numbers
+
+
+def pep440_satisfies(version, specifier):
+    "True if a PEP 440 version meets every clause of a specifier such as '>=2.5,<4', '~=1.4.2' or '==2.*'"
+    key = pep440_key(version)
+    if key is None:
+        return False
+    for clause in specifier.split(','):
+        if not clause.strip():
+            continue
+        match = SPECIFIER_CLAUSE.match(clause)
+        if not match:
+            return False
+        comparison, target = match.groups()
+        if comparison == '===':
+            satisfied = version.strip() == target
+        elif target.endswith('.*') and comparison in ('==', '!='):
+            satisfied = release_prefix_matches(version, target[:-2]) == (comparison == '==')
+        else:
+            target_key = pep440_key(target)
+            if target_key is None:
+                return False
+            if comparison == '~=':
+                # ~=1.4.2 is >=1.4.2 together with ==1.4.*
+                prefix = '.'.join(str(number) for number in release_numbers('pypi', target)[:-1])
+                satisfied = key >= target_key and release_prefix_matches(version, prefix)
+            else:
+                satisfied = SPECIFIER_OPERATORS[comparison](key, target_key)
+        if not satisfied:
+            return False
+    return True
+
+
+def latest_satisfying(versions, specifier):
+    "Highest PyPI version meeting a specifier, preferring stable ones as pip does, or None"
+    matching = [v for v in versions if pep440_satisfies(v, specifier)]
+    return latest_stable('pypi', matching) or max(matching, key=lambda v: version_key('pypi', v), default=None)
+
+
+def extract_version(requirement):
+    "Pull the version out of a requirement such as '~> 3.142' or '[1.0,2.0)'"
+    if not requirement:
+        return None
+    match = VERSION_TOKEN.search(requirement)
+    return match.group(0) if match else None
+
+
+def is_newer(ecosystem, candidate, current):
+    "True if candidate is a later version than current (which may be a requirement string)"
+    current_version = extract_version(current)
+    candidate_key = version_key(ecosystem, candidate)
+    current_key = version_key(ecosystem, current_version) if current_version else None
+    if candidate_key is None or current_key is None:
+        # Fall back to the old textual comparison for versions we cannot parse
+        return candidate != current
+    return candidate_key > current_key
+
+
+def release_numbers(ecosystem, version):
+    if ecosystem == 'pypi':
+        match = PEP440_VERSION.match(version)
+        return [int(part) for part in match.group('release').split('.')] if match else []
+    numbers = []
+    for part in SEGMENTS.findall(version):
+        if not part.isdigit():
+            break
+        numbers.append(int(part))
+    return numbers
+
+
+def upgrade_kind(ecosystem, current, candidate):
+    "Classify an upgrade from current to candidate as 'major', 'minor' or 'patch' ('' if not an upgrade)"
+    current_version = extract_version(current)
+    if not current_version or not candidate or not is_newer(ecosystem, candidate, current_version):
+        return ''
+    old = release_numbers(ecosystem, current_version) + [0, 0]
+    new = release_numbers(ecosystem, candidate) + [0, 0]
+    if new[0] != old[0]:
+        return 'major'
+    if new[1] != old[1]:
+        return 'minor'
+    return 'patch'
@@ -1,4 +1,28 @@
-import requests
+import argparse
+import glob
+import json
+import os
+import pickle
+import zipfile
+from bisect import bisect_right
+from collections import namedtuple
+
+import registry_client
+from resolution_planner import normalize_name
+from version_ordering import extract_version, version_key
+
+# OSV ecosystem names for the ecosystems the scanner understands
+OSV_ECOSYSTEMS = {
+    'PyPI': 'pypi',
+    'RubyGems': 'rubygems',
+    'Maven': 'maven',
+}
+
+# An advisory affecting one package: intervals are (introduced, fixed, last_affected)
+# version keys, any of which may be None, sorted by introduced; starts holds the
+# introduced keys (None as the empty tuple) for bisecting
+Advisory = namedtuple('Advisory', ['id', 'summary', 'starts', 'intervals', 'versions'])
+
 
 def check_vulnerabilities(dependency_name, version):
     # URL of the vulnerability database API
@@ -6,7 +30,7 @@ def check_vulnerabilities(dependency_name, version):
 
     try:
         # Send a GET request to the API
-        response = requests.get(api_url)
+        response = registry_client.get(api_url)
 
         # Check if the request was successful (status code 200)
         if response.status_code == 200:
@@ -34,5 +58,142 @@ def check_vulnerabilities(dependency_name, version):
     except Exception as e:
         print("An error occurred:", str(e))
 
-# Example usage
-check_vulnerabilities("org.seleniumhq.selenium", "3.3")
+
+def read_osv_documents(path):
+    "Yield OSV advisory dicts from a directory of .json files, a .zip dump, or a single .json file"
+    if os.path.isdir(path):
+        for file_path in glob.glob(os.path.join(path, '**', '*.json'), recursive=True):
+            with open(file_path, 'r', encoding='utf-8') as file:
+                yield json.load(file)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.endswith('.json'):
+                    yield json.loads(archive.read(name))
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            yield json.load(file)
+
+
+def affected_intervals(ecosystem, ranges):
+    """Turn OSV range events into (introduced, fixed, last_affected) version-key intervals.
+
+    Returns the intervals and the number dropped because a bound could not be parsed: read as
+    missing, such a bound would mean "from the beginning" or "never fixed"."""
+    intervals = []
+    for version_range in ranges:
+        if version_range.get('type') not in ('ECOSYSTEM', 'SEMVER'):
+            continue
+        for event in version_range.get('events', []):
+            if 'introduced' in event:
+                introduced = None if event['introduced'] == '0' else version_key(ecosystem, event['introduced'])
+                intervals.append([introduced, None, None, introduced is not None or event['introduced'] == '0'])
+            elif intervals and 'fixed' in event:
+                intervals[-1][1] = version_key(ecosystem, event['fixed'])
+                intervals[-1][3] = intervals[-1][3] and intervals[-1][1] is not None
+            elif intervals and 'last_affected' in event:
+                intervals[-1][2] = version_key(ecosystem, event['last_affected'])
+                intervals[-1][3] = intervals[-1][3] and intervals[-1][2] is not None
+    parsed = [tuple(interval[:3]) for interval in intervals if interval[3]]
+    return (sorted(parsed, key=lambda interval: () if interval[0] is None else interval[0]),
+            len(intervals) - len(parsed))
+
+
+class AdvisoryIndex:
+    "Advisories indexed by (ecosystem, normalized package name) with precomputed version intervals"
+
+    def __init__(self):
+        self.packages = {}
+        # Skipped while indexing, reported by the index builder
+        self.withdrawn = 0
+        self.dropped_intervals = 0
+
+    def add(self, document):
+        if document.get('withdrawn'):
+            self.withdrawn += 1
+            return
+        for affected in document.get('affected', []):
+            package = affected.get('package', {})
+            ecosystem = OSV_ECOSYSTEMS.get(package.get('ecosystem'))
+            if ecosystem is None or 'name' not in package:
+                continue
+            intervals, dropped = affected_intervals(ecosystem, affected.get('ranges', []))
+            self.dropped_intervals += dropped
+            advisory = Advisory(
+                document['id'],
+                document.get('summary', ''),
+                [() if interval[0] is None else interval[0] for interval in intervals],
+                intervals,
+                frozenset(affected.get('versions', [])),
+            )
+            self.packages.setdefault((ecosystem, normalize_name(ecosystem, package['name'])), []).append(advisory)
+
+    @classmethod
+    def from_osv(cls, paths):
+        index = cls()
+        for path in paths:
+            for document in read_osv_documents(path):
+                index.add(document)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        "Load a pickled index written by save, or build one from an OSV dump"
+        if not path.endswith('.pickle'):
+            return cls.from_osv([path])
+        index = cls()
+        with open(path, 'rb') as file:
+            packages = pickle.load(file)
+        index.packages = {package: [Advisory(*advisory) for advisory in advisories]
+                          for package, advisories in packages.items()}
+        return index
+
+    def save(self, path):
+        # Stored as plain tuples so the file does not depend on how this module was imported
+        packages = {package: [tuple(advisory) for advisory in advisories]
+                    for package, advisories in self.packages.items()}
+        with open(path, 'wb') as file:
+            pickle.dump(packages, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def matches(self, ecosystem, name, version):
+        "Return the advisories affecting name at version (which may be a requirement string)"
+        advisories = self.packages.get((ecosystem, normalize_name(ecosystem, name)))
+        if not advisories:
+            return []
+        version = extract_version(version)
+        if not version:
+            return []
+        key = version_key(ecosystem, version)
+
+        found = []
+        for advisory in advisories:
+            if version in advisory.versions:
+                found.append(advisory)
+            elif key is not None and self.affects(advisory, key):
+                found.append(advisory)
+        return found
+
+    @staticmethod
+    def affects(advisory, key):
+        # Only intervals introduced at or before key can contain it
+        for introduced, fixed, last_affected in advisory.intervals[:bisect_right(advisory.starts, key)]:
+            if fixed is not None and key >= fixed:
+                continue
+            if last_affected is not None and key > last_affected:
+                continue
+            return True
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a local advisory index from OSV dumps")
+    parser.add_argument('sources', nargs='+', help="OSV .zip dumps, directories of OSV .json files, or .json files")
+    parser.add_argument('-o', '--output', default='advisories.pickle', help="index file to write")
+    args = parser.parse_args()
+
+    index = AdvisoryIndex.from_osv(args.sources)
+    index.save(args.output)
+    print(f"Indexed advisories for {len(index.packages)} packages into {args.output}")
+    if index.withdrawn or index.dropped_intervals:
+        print(f"Skipped {index.withdrawn} withdrawn advisories and {index.dropped_intervals} affected ranges"
+              " with versions that could not be parsed")